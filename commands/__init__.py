@@ -1,35 +1,65 @@
+import importlib
+import time
+
+# Command modules, in the order they are set up
+_MODULES = (
+    "ctf_info",
+    "ctf_setup",
+    "publish_ctf",
+    "weekend_ctfs",
+    "ctf_solve",
+    "ctfd_challenges",
+    "challenge_tracker",
+    "ctf_add_challenge",
+    "ctf_addcreds",
+    "rctf_challenges",
+    "help_command",
+    "ctf_changeurl",
+    "ctf_changetime",
+    "ctf_converttoteams",
+    "ctf_converttosingle",
+)
+
+def _ttl_memoize(func, ttl=60):
+    """
+    Cache check_permissions results per (guild, member, permissions) for ttl seconds
+    """
+    cache = {}
+    
+    def wrapper(guild, bot_member, required_permissions):
+        key = (guild.id, bot_member.id, frozenset(required_permissions))
+        now = time.monotonic()
+        entry = cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+        
+        result = func(guild, bot_member, required_permissions)
+        cache[key] = (now + ttl, result)
+        return result
+    
+    wrapper.cache = cache
+    return wrapper
+
 def setup_commands(bot, guild_id, check_permissions):
     """
     Set up all command modules
     """
-    from . import ctf_info
-    from . import ctf_setup
-    from . import publish_ctf
-    from . import weekend_ctfs
-    from . import ctf_solve
-    from . import ctfd_challenges
-    from . import challenge_tracker
-    from . import ctf_addcreds
-    from . import ctf_add_challenge
-    from . import rctf_challenges
-    from . import help_command
-    from . import ctf_changeurl
-    from . import ctf_changetime
-    from . import ctf_converttoteams
-    from . import ctf_converttosingle
+    check_permissions = _ttl_memoize(check_permissions)
+    
+    # Drop cached permission results whenever they may have changed
+    @bot.listen("on_guild_role_update")
+    async def invalidate_on_role_update(before, after):
+        check_permissions.cache.clear()
+    
+    @bot.listen("on_guild_channel_update")
+    async def invalidate_on_channel_update(before, after):
+        check_permissions.cache.clear()
+    
+    @bot.listen("on_member_update")
+    async def invalidate_on_member_update(before, after):
+        if before.roles != after.roles:
+            for key in [key for key in check_permissions.cache if key[1] == after.id]:
+                del check_permissions.cache[key]
     
-    ctf_info.setup(bot, guild_id, check_permissions)
-    ctf_setup.setup(bot, guild_id, check_permissions)
-    publish_ctf.setup(bot, guild_id, check_permissions)
-    weekend_ctfs.setup(bot, guild_id, check_permissions)
-    ctf_solve.setup(bot, guild_id, check_permissions)
-    ctfd_challenges.setup(bot, guild_id, check_permissions)
-    challenge_tracker.setup(bot, guild_id, check_permissions)
-    ctf_add_challenge.setup(bot, guild_id, check_permissions)
-    ctf_addcreds.setup(bot, guild_id, check_permissions)
-    rctf_challenges.setup(bot, guild_id, check_permissions)
-    help_command.setup(bot,guild_id, check_permissions)
-    ctf_changeurl.setup(bot, guild_id, check_permissions)
-    ctf_changetime.setup(bot, guild_id, check_permissions)
-    ctf_converttoteams.setup(bot, guild_id, check_permissions)
-    ctf_converttosingle.setup(bot, guild_id, check_permissions)
\ No newline at end of file
+    for name in _MODULES:
+        importlib.import_module(f".{name}", __package__).setup(bot, guild_id, check_permissions)
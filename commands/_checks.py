@@ -0,0 +1,25 @@
+import logging
+from util import is_ctf_category
+
+logger = logging.getLogger('discord_bot')
+
+async def guard_ctf_command(interaction, check_permissions, required_permissions, command_name, channel=None):
+    """
+    Check the bot's permissions and, if a channel is given, that it sits in a CTF category.
+    Sends an ephemeral error and returns False if either check fails
+    """
+    perm_check = check_permissions(interaction.guild, interaction.guild.me, required_permissions)
+    if not all(perm_check.values()):
+        missing_perms = [perm for perm, has_perm in perm_check.items() if not has_perm]
+        logger.error(f"Missing permissions for {command_name} command: {', '.join(missing_perms)}")
+        await interaction.response.send_message(f"Bot is missing required permissions: {', '.join(missing_perms)}", ephemeral=True)
+        return False
+
+    if channel is not None and not (channel.category and is_ctf_category(channel.category.name)):
+        await interaction.response.send_message(
+            "This command can only be used in channels within a CTF category (e.g., '2025 CTFs')!",
+            ephemeral=True
+        )
+        return False
+
+    return True
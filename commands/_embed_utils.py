@@ -0,0 +1,9 @@
+def upsert_field(embed, name, value, inline=False):
+    """
+    Update the field with the given name, or add it if the embed doesn't have one
+    """
+    index = {field.name: i for i, field in enumerate(embed.fields)}.get(name)
+    if index is None:
+        embed.add_field(name=name, value=value, inline=inline)
+    else:
+        embed.set_field_at(index, name=name, value=value, inline=inline)
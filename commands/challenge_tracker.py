@@ -2,9 +2,7 @@ import discord
 from discord.ext import commands
 import logging
 import asyncio
-import traceback
-from datetime import datetime
-import json
+import orjson
 import os
 
 # Function to get a logger
@@ -13,110 +11,212 @@ def get_logger():
 
 logger = get_logger()
 
+# Seconds to wait after a change before writing assignments to disk
+SAVE_DELAY = 2.0
+
+# Seconds to coalesce summary updates for a channel before editing the embed
+SUMMARY_DELAY = 1.5
+
+# Challenge tracker embed text
+TRACKER_TITLE = "📝 Challenge Assignment Tracker"
+TRACKER_DESCRIPTION = "Use the buttons below to indicate if you're working on this challenge."
+TRACKER_FIELD_NAME = "Currently Working On This:"
+NOBODY_WORKING = "Nobody is working on this challenge yet."
+
+# Custom IDs of the tracker buttons
+WORK_BUTTON_ID = "ctf_work"
+STOP_BUTTON_ID = "ctf_stop"
+
+# Maximum number of threads /ctf_refreshassignment checks at once
+REFRESH_CONCURRENCY = 5
+
+# Fire-and-forget tasks; the event loop only keeps weak references to
+# tasks, so they are held here until they finish
+_background_tasks = set()
+
+def _spawn(coro):
+    """Start a background task and keep it referenced until it is done"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+# Pending summary updates, {channel_id: TimerHandle}
+_pending_summaries = {}
+
+# Last posted summary content, {channel_id: (message_id, payload_hash)}
+_summary_hashes = {}
+
 # Simple storage for assignments
 class AssignmentStore:
     def __init__(self):
         self.data = {
-            "assignments": {},  # {channel_id: {thread_id: [user_id, user_id]}}
-            "summaries": {}     # {channel_id: message_id}
+            "assignments": {},  # {channel_id: {thread_id: {user_id: None}}}, users in assignment order
+            "summaries": {},    # {channel_id: message_id}
+            "trackers": {}      # {channel_id: {thread_id: message_id}}
         }
+        self.user_thread = {}   # {channel_id: {user_id: thread_id}}
         self.file_path = "assignments.json"
+        self._dirty = False
+        self._flush_handle = None
+        self._queue = asyncio.Queue()
+        self._writer_task = None
         self.load()
     
     def load(self):
         """Load data from file"""
         try:
             if os.path.exists(self.file_path):
-                with open(self.file_path, "r") as f:
-                    loaded_data = json.load(f)
+                with open(self.file_path, "rb") as f:
+                    loaded_data = orjson.loads(f.read())
                     # Convert string keys to integers
                     assignments = {}
                     for channel_id, threads in loaded_data.get("assignments", {}).items():
                         assignments[int(channel_id)] = {}
                         for thread_id, users in threads.items():
-                            assignments[int(channel_id)][int(thread_id)] = [int(user) for user in users]
+                            assignments[int(channel_id)][int(thread_id)] = dict.fromkeys(int(user) for user in users)
                     
                     summaries = {}
                     for channel_id, message_id in loaded_data.get("summaries", {}).items():
                         summaries[int(channel_id)] = int(message_id)
                     
+                    trackers = {}
+                    for channel_id, threads in loaded_data.get("trackers", {}).items():
+                        trackers[int(channel_id)] = {int(thread_id): int(message_id) for thread_id, message_id in threads.items()}
+                    
                     self.data = {
                         "assignments": assignments,
-                        "summaries": summaries
+                        "summaries": summaries,
+                        "trackers": trackers
+                    }
+                    
+                    # Rebuild the reverse user -> thread index
+                    self.user_thread = {
+                        channel_id: {user_id: thread_id for thread_id, users in threads.items() for user_id in users}
+                        for channel_id, threads in assignments.items()
                     }
                     logger.info(f"Loaded assignment data from {self.file_path}")
         except Exception as e:
             logger.error(f"Error loading assignment data: {e}")
     
+    def _snapshot(self):
+        """Serialize the data to JSON bytes (int keys become strings, user dicts become lists)"""
+        data = {
+            **self.data,
+            "assignments": {
+                channel_id: {thread_id: list(users) for thread_id, users in threads.items()}
+                for channel_id, threads in self.data["assignments"].items()
+            }
+        }
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    
+    def _write_atomic(self, snapshot):
+        """Write a snapshot to a temporary file and swap it into place"""
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
+    
     def save(self):
         """Save data to file"""
         try:
-            # Convert data for JSON serialization (int keys to strings)
-            serializable = {
-                "assignments": {},
-                "summaries": {}
-            }
-            
-            for channel_id, threads in self.data["assignments"].items():
-                serializable["assignments"][str(channel_id)] = {}
-                for thread_id, users in threads.items():
-                    serializable["assignments"][str(channel_id)][str(thread_id)] = [str(user) for user in users]
-            
-            for channel_id, message_id in self.data["summaries"].items():
-                serializable["summaries"][str(channel_id)] = str(message_id)
-            
-            with open(self.file_path, "w") as f:
-                json.dump(serializable, f)
+            self._write_atomic(self._snapshot())
         except Exception as e:
             logger.error(f"Error saving assignment data: {e}")
     
+    def _mark_dirty(self):
+        """Schedule a save, coalescing bursts of changes into a single write"""
+        self._dirty = True
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Not running inside the bot's event loop, save straight away
+            self._dirty = False
+            self.save()
+            return
+        self._flush_handle = loop.call_later(SAVE_DELAY, lambda: _spawn(self.flush()))
+    
+    def start_writer(self):
+        """Start the background task that writes snapshots to disk"""
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer_loop())
+    
+    async def _writer_loop(self):
+        """Write queued snapshots one at a time, off the event loop"""
+        while True:
+            snapshot = await self._queue.get()
+            try:
+                await asyncio.to_thread(self._write_atomic, snapshot)
+            except Exception as e:
+                logger.error(f"Error saving assignment data: {e}")
+            finally:
+                self._queue.task_done()
+    
+    async def flush(self):
+        """Queue pending changes for the writer and wait until they are on disk"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        if self._dirty:
+            self._dirty = False
+            self.start_writer()
+            self._queue.put_nowait(self._snapshot())
+        await self._queue.join()
+    
     def assign_user(self, channel_id, thread_id, user_id):
         """Assign a user to a thread"""
         # Initialize if needed
-        if str(channel_id) not in self.data["assignments"]:
-            self.data["assignments"][channel_id] = {}
+        threads = self.data["assignments"].setdefault(channel_id, {})
+        user_threads = self.user_thread.setdefault(channel_id, {})
+        
+        previous_thread = user_threads.get(user_id)
+        if previous_thread == thread_id:
+            return False
         
-        # Remove user from any existing assignments in this channel
-        for thread, users in list(self.data["assignments"][channel_id].items()):
-            if user_id in users:
-                users.remove(user_id)
+        # Remove user from their existing assignment in this channel
+        if previous_thread is not None:
+            users = threads.get(previous_thread)
+            if users is not None:
+                users.pop(user_id, None)
                 # Clean up empty entries
                 if not users:
-                    del self.data["assignments"][channel_id][thread]
-        
-        # Create thread entry if needed
-        if thread_id not in self.data["assignments"][channel_id]:
-            self.data["assignments"][channel_id][thread_id] = []
+                    del threads[previous_thread]
         
         # Add user to thread
-        if user_id not in self.data["assignments"][channel_id][thread_id]:
-            self.data["assignments"][channel_id][thread_id].append(user_id)
-            self.save()
-            return True
-        return False
+        threads.setdefault(thread_id, {})[user_id] = None
+        user_threads[user_id] = thread_id
+        self._mark_dirty()
+        return True
     
     def remove_user(self, channel_id, thread_id, user_id):
         """Remove a user from a thread"""
-        if (channel_id in self.data["assignments"] and
-            thread_id in self.data["assignments"][channel_id] and
-            user_id in self.data["assignments"][channel_id][thread_id]):
-            
-            self.data["assignments"][channel_id][thread_id].remove(user_id)
-            
-            # Clean up empty entries
-            if not self.data["assignments"][channel_id][thread_id]:
-                del self.data["assignments"][channel_id][thread_id]
-            
-            if not self.data["assignments"][channel_id]:
-                del self.data["assignments"][channel_id]
-            
-            self.save()
-            return True
-        return False
+        user_threads = self.user_thread.get(channel_id)
+        if not user_threads or user_threads.get(user_id) != thread_id:
+            return False
+        
+        del user_threads[user_id]
+        threads = self.data["assignments"][channel_id]
+        threads[thread_id].pop(user_id, None)
+        
+        # Clean up empty entries
+        if not threads[thread_id]:
+            del threads[thread_id]
+        
+        if not threads:
+            del self.data["assignments"][channel_id]
+            del self.user_thread[channel_id]
+        
+        self._mark_dirty()
+        return True
     
     def get_users_for_thread(self, channel_id, thread_id):
         """Get users assigned to a thread"""
-        return self.data["assignments"].get(channel_id, {}).get(thread_id, [])
+        return list(self.data["assignments"].get(channel_id, {}).get(thread_id, ()))
     
     def get_all_assignments(self, channel_id):
         """Get all assignments for a channel"""
@@ -125,23 +225,50 @@ class AssignmentStore:
     def set_summary_message(self, channel_id, message_id):
         """Set the summary message ID for a channel"""
         self.data["summaries"][channel_id] = message_id
-        self.save()
+        self._mark_dirty()
     
     def get_summary_message(self, channel_id):
         """Get the summary message ID for a channel"""
         return self.data["summaries"].get(channel_id)
     
-    def clear_solved_threads(self):
-        """Remove solved threads from assignments"""
-        # This is handled during updates rather than proactively
+    def set_tracker_message(self, channel_id, thread_id, message_id):
+        """Set the tracker message ID for a thread"""
+        threads = self.data["trackers"].setdefault(channel_id, {})
+        if threads.get(thread_id) != message_id:
+            threads[thread_id] = message_id
+            self._mark_dirty()
+    
+    def get_tracker_message(self, channel_id, thread_id):
+        """Get the tracker message ID for a thread"""
+        return self.data["trackers"].get(channel_id, {}).get(thread_id)
+    
+    def remove_threads(self, channel_id, thread_ids):
+        """Remove threads and everyone assigned to them from a channel"""
+        threads = self.data["assignments"].get(channel_id, {})
+        user_threads = self.user_thread.get(channel_id, {})
+        trackers = self.data["trackers"].get(channel_id, {})
+        
+        for thread_id in thread_ids:
+            for user_id in threads.pop(thread_id, ()):
+                user_threads.pop(user_id, None)
+            trackers.pop(thread_id, None)
+        
+        # Clean up empty entries
+        if channel_id in self.data["assignments"] and not threads:
+            del self.data["assignments"][channel_id]
+            self.user_thread.pop(channel_id, None)
+        if channel_id in self.data["trackers"] and not trackers:
+            del self.data["trackers"][channel_id]
+        
+        self._mark_dirty()
 
 # Create a work button
 class WorkButton(discord.ui.Button):
-    def __init__(self, thread_id):
+    def __init__(self):
         super().__init__(
             style=discord.ButtonStyle.primary,
             label="Work on this",
-            custom_id=f"work_{thread_id}"
+            custom_id=WORK_BUTTON_ID
         )
     
     async def callback(self, interaction):
@@ -150,23 +277,33 @@ class WorkButton(discord.ui.Button):
 
 # Create a stop button
 class StopButton(discord.ui.Button):
-    def __init__(self, thread_id):
+    def __init__(self):
         super().__init__(
             style=discord.ButtonStyle.danger,
             label="Stop working on this",
-            custom_id=f"stop_{thread_id}"
+            custom_id=STOP_BUTTON_ID
         )
     
     async def callback(self, interaction):
         # We'll handle this in the main setup function
         pass
 
-# Challenge tracker view
+# Challenge tracker view, shared by every thread since the buttons are
+# handled by the on_interaction listener using interaction.channel
 class ChallengeView(discord.ui.View):
-    def __init__(self, thread_id):
+    def __init__(self):
         super().__init__(timeout=None)
-        self.add_item(WorkButton(thread_id))
-        self.add_item(StopButton(thread_id))
+        self.add_item(WorkButton())
+        self.add_item(StopButton())
+
+def refresh_ctf_channels(bot):
+    """Rebuild the set of text channel IDs that sit in a CTF category"""
+    bot.ctf_channels = {
+        channel.id
+        for guild in bot.guilds
+        for channel in guild.text_channels
+        if channel.category and channel.category.name.endswith("CTFs")
+    }
 
 def setup(bot, guild_id, check_permissions):
     """Set up the challenge tracker system"""
@@ -174,46 +311,63 @@ def setup(bot, guild_id, check_permissions):
     if not hasattr(bot, "assignments"):
         bot.assignments = AssignmentStore()
     
-    # Create a persistent view for the buttons
-    @bot.event
-    async def on_ready():
-        # Register the persistent view
-        bot.add_view(ChallengeView(0))  # A generic view that we'll identify by custom_id
+    # Single writer for the assignment file
+    @bot.listen("on_ready")
+    async def start_assignment_writer():
+        bot.assignments.start_writer()
+    
+    # Make sure pending assignment changes hit the disk
+    @bot.listen("on_disconnect")
+    async def flush_assignments():
+        await bot.assignments.flush()
+    
+    # Track which channels sit in a CTF category
+    if not hasattr(bot, "ctf_channels"):
+        bot.ctf_channels = set()
+    
+    @bot.listen("on_ready")
+    async def load_ctf_channels():
+        refresh_ctf_channels(bot)
+    
+    @bot.listen("on_guild_channel_create")
+    async def ctf_channel_created(channel):
+        refresh_ctf_channels(bot)
+    
+    @bot.listen("on_guild_channel_update")
+    async def ctf_channel_updated(before, after):
+        if before.name != after.name or getattr(before, "category_id", None) != getattr(after, "category_id", None):
+            refresh_ctf_channels(bot)
+    
+    @bot.listen("on_guild_channel_delete")
+    async def ctf_channel_deleted(channel):
+        bot.ctf_channels.discard(channel.id)
+    
+    # Register the shared persistent view for the buttons (commands are set up
+    # from setup_hook, so overriding on_ready here would replace the bot's own)
+    if not hasattr(bot, "tracker_view"):
+        bot.tracker_view = ChallengeView()
+        bot.add_view(bot.tracker_view)
     
     # Handle thread creation
     @bot.event
     async def on_thread_create(thread):
         try:
             # Only process threads in CTF categories
-            if (thread.parent and 
-                thread.parent.category and 
-                thread.parent.category.name.endswith("CTFs")):
+            if thread.parent_id in bot.ctf_channels:
                 
                 # Don't add tracker to solved threads
-                if "[SOLVED]" in thread.name:
+                if thread.name.startswith("[SOLVED]"):
                     return
                 
                 # Create embed with buttons
-                embed = discord.Embed(
-                    title="📝 Challenge Assignment Tracker",
-                    description="Use the buttons below to indicate if you're working on this challenge.",
-                    color=discord.Color.blue()
-                )
-                
-                embed.add_field(
-                    name="Currently Working On This:",
-                    value="Nobody is working on this challenge yet.",
-                    inline=False
-                )
-                
-                # Each thread gets its own view
-                view = ChallengeView(thread.id)
+                embed = make_tracker_embed([])
                 
                 # Send the message
-                await thread.send(embed=embed, view=view)
+                message = await thread.send(embed=embed, view=bot.tracker_view)
+                bot.assignments.set_tracker_message(thread.parent.id, thread.id, message.id)
                 
                 # Update the summary in the parent channel
-                await update_summary(thread.parent, bot)
+                schedule_summary(thread.parent, bot)
                 
                 logger.info(f"Added challenge tracker to new thread: {thread.name}")
         except Exception as e:
@@ -235,11 +389,11 @@ def setup(bot, guild_id, check_permissions):
                 # Clear this thread from assignments
                 assignments = bot.assignments.get_all_assignments(channel_id)
                 if thread_id in assignments:
-                    for user_id in assignments[thread_id]:
+                    for user_id in list(assignments[thread_id]):
                         bot.assignments.remove_user(channel_id, thread_id, user_id)
                 
                 # Update the summary
-                await update_summary(after.parent, bot)
+                schedule_summary(after.parent, bot)
                 
                 logger.info(f"Removed solved thread from assignments: {after.name}")
         except Exception as e:
@@ -256,7 +410,7 @@ def setup(bot, guild_id, check_permissions):
             channel = interaction.channel
             
             # Check if this is a CTF channel
-            if not channel.category or not channel.category.name.endswith("CTFs"):
+            if channel.id not in bot.ctf_channels:
                 await interaction.response.send_message(
                     "This command can only be used in channels within a CTF category!",
                     ephemeral=True
@@ -265,63 +419,51 @@ def setup(bot, guild_id, check_permissions):
             
             await interaction.response.defer(ephemeral=True)
             
-            # Update the summary
+            # Update the summary, reposting it even if nothing changed
+            _summary_hashes.pop(channel.id, None)
             await update_summary(channel, bot)
             
-            # Count threads that need embeds
-            count = 0
-            for thread in channel.threads:
-                # Skip solved threads
-                if "[SOLVED]" in thread.name:
-                    continue
-                
-                # Check if thread has tracker embed
-                has_tracker = False
-                async for message in thread.history(limit=20):
-                    if (message.author == bot.user and 
-                        message.embeds and 
-                        len(message.embeds) > 0 and 
-                        message.embeds[0].title == "📝 Challenge Assignment Tracker"):
-                        has_tracker = True
-                        break
-                
-                # Add tracker if missing
-                if not has_tracker:
-                    embed = discord.Embed(
-                        title="📝 Challenge Assignment Tracker",
-                        description="Use the buttons below to indicate if you're working on this challenge.",
-                        color=discord.Color.blue()
-                    )
+            # Limit how many threads are checked at once to respect rate limits
+            semaphore = asyncio.Semaphore(REFRESH_CONCURRENCY)
+            
+            async def ensure_tracker(thread):
+                """Add a tracker embed to the thread if it is missing one"""
+                async with semaphore:
+                    # Check the known tracker message first
+                    tracker_id = bot.assignments.get_tracker_message(channel.id, thread.id)
+                    if tracker_id:
+                        try:
+                            await thread.fetch_message(tracker_id)
+                            return False
+                        except discord.NotFound:
+                            pass
                     
+                    # Check if thread has tracker embed
+                    async for message in thread.history(limit=20):
+                        if (message.author == bot.user and 
+                            message.embeds and 
+                            len(message.embeds) > 0 and 
+                            message.embeds[0].title == TRACKER_TITLE):
+                            bot.assignments.set_tracker_message(channel.id, thread.id, message.id)
+                            return False
+                    
+                    # Add tracker if missing
                     users = bot.assignments.get_users_for_thread(channel.id, thread.id)
-                    if users:
-                        user_mentions = []
-                        for user_id in users:
-                            user = bot.get_user(user_id)
-                            if user:
-                                user_mentions.append(user.mention)
-                        
-                        if user_mentions:
-                            embed.add_field(
-                                name="Currently Working On This:",
-                                value="\n".join(user_mentions),
-                                inline=False
-                            )
-                        else:
-                            embed.add_field(
-                                name="Currently Working On This:",
-                                value="Nobody is working on this challenge yet.",
-                                inline=False
-                            )
-                    else:
-                        embed.add_field(
-                            name="Currently Working On This:",
-                            value="Nobody is working on this challenge yet.",
-                            inline=False
-                        )
+                    embed = make_tracker_embed(get_user_mentions(channel.guild, users))
                     
-                    view = ChallengeView(thread.id)
-                    await thread.send(embed=embed, view=view)
+                    message = await thread.send(embed=embed, view=bot.tracker_view)
+                    bot.assignments.set_tracker_message(channel.id, thread.id, message.id)
+                    return True
+            
+            # Check all unsolved threads concurrently and count the added embeds;
+            # a thread that fails is logged without stopping the others
+            threads = [thread for thread in channel.threads if not thread.name.startswith("[SOLVED]")]
+            results = await asyncio.gather(*(ensure_tracker(thread) for thread in threads), return_exceptions=True)
+            count = 0
+            for thread, result in zip(threads, results):
+                if isinstance(result, BaseException):
+                    logger.error(f"Error refreshing tracker in thread {thread.name}: {str(result)}")
+                elif result is True:
                     count += 1
             
             await interaction.followup.send(
@@ -335,233 +477,231 @@ def setup(bot, guild_id, check_permissions):
     # Handle button interactions
     @bot.listen("on_interaction")
     async def handle_buttons(interaction):
+        # Skip anything that isn't a component interaction
+        if interaction.type is not discord.InteractionType.component:
+            return
+        
+        # Skip if not our buttons (work_<id>/stop_<id> come from older trackers)
+        custom_id = interaction.data.get("custom_id", "")
+        handler = _BUTTON_HANDLERS.get(custom_id) or _LEGACY_BUTTON_HANDLERS.get(custom_id.partition("_")[0])
+        if handler is None:
+            return
+        
+        # We're in a thread, so get the thread and parent
+        if not isinstance(interaction.channel, discord.Thread):
+            await interaction.response.send_message("This button only works in challenge threads.", ephemeral=True)
+            return
+        
+        if not interaction.channel.parent:
+            await interaction.response.send_message("Could not find parent channel.", ephemeral=True)
+            return
+        
         try:
-            # Skip if not a button interaction
-            if not isinstance(interaction, discord.Interaction) or not interaction.data or interaction.data.get("component_type") != 2:
-                return
-            
-            # Get the custom ID
-            custom_id = interaction.data.get("custom_id", "")
-            
-            # Skip if not our buttons
-            if not custom_id.startswith(("work_", "stop_")):
-                return
-            
-            # We're in a thread, so get the thread and parent
-            if not isinstance(interaction.channel, discord.Thread):
-                await interaction.response.send_message("This button only works in challenge threads.", ephemeral=True)
-                return
-            
-            thread = interaction.channel
-            if not thread.parent:
-                await interaction.response.send_message("Could not find parent channel.", ephemeral=True)
-                return
-            
             # Process the button press
-            if custom_id.startswith("work_"):
-                # User wants to work on this challenge
-                await interaction.response.defer(ephemeral=True)
-                
-                # Get user and thread IDs
-                user_id = interaction.user.id
-                thread_id = thread.id
-                channel_id = thread.parent.id
-                
-                # Assign user to thread
-                assigned = bot.assignments.assign_user(channel_id, thread_id, user_id)
-                
-                # Update the thread embed
-                await update_thread_embed(thread, bot)
-                
-                # Update the summary embed
-                await update_summary(thread.parent, bot)
-                
-                # Confirm to user
-                if assigned:
-                    await interaction.followup.send("You are now working on this challenge!", ephemeral=True)
-                else:
-                    await interaction.followup.send("You're already working on this challenge.", ephemeral=True)
-            
-            elif custom_id.startswith("stop_"):
-                # User wants to stop working on this challenge
-                await interaction.response.defer(ephemeral=True)
-                
-                # Get user and thread IDs
-                user_id = interaction.user.id
-                thread_id = thread.id
-                channel_id = thread.parent.id
-                
-                # Remove user from thread
-                removed = bot.assignments.remove_user(channel_id, thread_id, user_id)
-                
-                # Update the thread embed
-                await update_thread_embed(thread, bot)
-                
-                # Update the summary embed
-                await update_summary(thread.parent, bot)
-                
-                # Confirm to user
-                if removed:
-                    await interaction.followup.send("You are no longer working on this challenge.", ephemeral=True)
-                else:
-                    await interaction.followup.send("You weren't assigned to this challenge.", ephemeral=True)
+            await handler(interaction, bot)
         
-        except Exception as e:
-            logger.error(f"Error handling button interaction: {str(e)}")
+        except discord.HTTPException:
+            logger.exception("Error handling button interaction")
             try:
                 await interaction.followup.send("An error occurred. Please try again.", ephemeral=True)
-            except:
+            except discord.HTTPException:
                 pass
 
+async def _handle_work(interaction, bot):
+    """User wants to work on this challenge"""
+    thread = interaction.channel
+    await interaction.response.defer(ephemeral=True)
+    
+    # Assign user to thread
+    assigned = bot.assignments.assign_user(thread.parent.id, thread.id, interaction.user.id)
+    
+    # Update the thread embed
+    await update_thread_embed(thread, bot)
+    
+    # Update the summary embed
+    schedule_summary(thread.parent, bot)
+    
+    # Confirm to user
+    if assigned:
+        await interaction.followup.send("You are now working on this challenge!", ephemeral=True)
+    else:
+        await interaction.followup.send("You're already working on this challenge.", ephemeral=True)
+
+async def _handle_stop(interaction, bot):
+    """User wants to stop working on this challenge"""
+    thread = interaction.channel
+    await interaction.response.defer(ephemeral=True)
+    
+    # Remove user from thread
+    removed = bot.assignments.remove_user(thread.parent.id, thread.id, interaction.user.id)
+    
+    # Update the thread embed
+    await update_thread_embed(thread, bot)
+    
+    # Update the summary embed
+    schedule_summary(thread.parent, bot)
+    
+    # Confirm to user
+    if removed:
+        await interaction.followup.send("You are no longer working on this challenge.", ephemeral=True)
+    else:
+        await interaction.followup.send("You weren't assigned to this challenge.", ephemeral=True)
+
+# Button custom IDs mapped to their handlers
+_BUTTON_HANDLERS = {
+    WORK_BUTTON_ID: _handle_work,
+    STOP_BUTTON_ID: _handle_stop,
+}
+
+# Per-thread custom ID prefixes used by trackers posted before the IDs were static
+_LEGACY_BUTTON_HANDLERS = {
+    "work": _handle_work,
+    "stop": _handle_stop,
+}
+
+def make_tracker_embed(user_mentions):
+    """Build the challenge tracker embed listing who is working on a thread"""
+    embed = discord.Embed(
+        title=TRACKER_TITLE,
+        description=TRACKER_DESCRIPTION,
+        color=discord.Color.blue()
+    )
+    embed.add_field(
+        name=TRACKER_FIELD_NAME,
+        value="\n".join(user_mentions) if user_mentions else NOBODY_WORKING,
+        inline=False
+    )
+    return embed
+
+def get_user_mentions(guild, user_ids):
+    """Resolve user IDs to mentions from the guild's member cache"""
+    mentions = []
+    for user_id in user_ids:
+        member = guild.get_member(user_id)
+        # A raw mention still renders if the member isn't cached
+        mentions.append(member.mention if member else f"<@{user_id}>")
+    return mentions
+
 async def update_thread_embed(thread, bot):
     """Update the challenge tracker embed in a thread"""
     try:
-        # Find the tracker embed
+        # Get assigned users
+        users = bot.assignments.get_users_for_thread(thread.parent.id, thread.id)
+        
+        # Create updated embed
+        embed = make_tracker_embed(get_user_mentions(thread.guild, users))
+        
+        # Edit the tracker directly if we know which message it is
+        tracker_id = bot.assignments.get_tracker_message(thread.parent.id, thread.id)
+        if tracker_id:
+            try:
+                await thread.get_partial_message(tracker_id).edit(embed=embed)
+                return
+            except discord.NotFound:
+                logger.warning(f"Tracker message {tracker_id} not found in thread {thread.name}")
+        
+        # Otherwise find the tracker embed
         async for message in thread.history(limit=20):
             if (message.author == bot.user and 
                 message.embeds and 
                 len(message.embeds) > 0 and 
-                message.embeds[0].title == "📝 Challenge Assignment Tracker"):
-                
-                # Get assigned users
-                users = bot.assignments.get_users_for_thread(thread.parent.id, thread.id)
-                
-                # Create updated embed
-                embed = discord.Embed(
-                    title="📝 Challenge Assignment Tracker",
-                    description="Use the buttons below to indicate if you're working on this challenge.",
-                    color=discord.Color.blue()
-                )
-                
-                if users:
-                    user_mentions = []
-                    for user_id in users:
-                        user = bot.get_user(user_id)
-                        if user:
-                            user_mentions.append(user.mention)
-                    
-                    if user_mentions:
-                        embed.add_field(
-                            name="Currently Working On This:",
-                            value="\n".join(user_mentions),
-                            inline=False
-                        )
-                    else:
-                        embed.add_field(
-                            name="Currently Working On This:",
-                            value="Nobody is working on this challenge yet.",
-                            inline=False
-                        )
-                else:
-                    embed.add_field(
-                        name="Currently Working On This:",
-                        value="Nobody is working on this challenge yet.",
-                        inline=False
-                    )
+                message.embeds[0].title == TRACKER_TITLE):
                 
                 # Update the message
                 await message.edit(embed=embed)
+                bot.assignments.set_tracker_message(thread.parent.id, thread.id, message.id)
                 return
         
         # If we didn't find the embed, create a new one
-        embed = discord.Embed(
-            title="📝 Challenge Assignment Tracker",
-            description="Use the buttons below to indicate if you're working on this challenge.",
-            color=discord.Color.blue()
-        )
-        
-        users = bot.assignments.get_users_for_thread(thread.parent.id, thread.id)
-        
-        if users:
-            user_mentions = []
-            for user_id in users:
-                user = bot.get_user(user_id)
-                if user:
-                    user_mentions.append(user.mention)
-            
-            if user_mentions:
-                embed.add_field(
-                    name="Currently Working On This:",
-                    value="\n".join(user_mentions),
-                    inline=False
-                )
-            else:
-                embed.add_field(
-                    name="Currently Working On This:",
-                    value="Nobody is working on this challenge yet.",
-                    inline=False
-                )
-        else:
-            embed.add_field(
-                name="Currently Working On This:",
-                value="Nobody is working on this challenge yet.",
-                inline=False
-            )
-        
-        view = ChallengeView(thread.id)
-        await thread.send(embed=embed, view=view)
+        message = await thread.send(embed=embed, view=bot.tracker_view)
+        bot.assignments.set_tracker_message(thread.parent.id, thread.id, message.id)
     
     except Exception as e:
         logger.error(f"Error updating thread embed: {str(e)}")
 
+def schedule_summary(channel, bot):
+    """Schedule a summary update, coalescing bursts into a single edit"""
+    if channel.id in _pending_summaries:
+        return
+    loop = asyncio.get_running_loop()
+    _pending_summaries[channel.id] = loop.call_later(
+        SUMMARY_DELAY,
+        lambda: _spawn(run_scheduled_summary(channel, bot))
+    )
+
+async def run_scheduled_summary(channel, bot):
+    """Run a summary update scheduled by schedule_summary"""
+    _pending_summaries.pop(channel.id, None)
+    await update_summary(channel, bot)
+
 async def update_summary(channel, bot):
     """Update or create the summary embed in a channel"""
     try:
-        # Check if we have a summary message ID
-        summary_id = bot.assignments.get_summary_message(channel.id)
-        summary_message = None
-        
-        if summary_id:
-            try:
-                summary_message = await channel.fetch_message(summary_id)
-            except:
-                # Message not found, we'll create a new one
-                pass
-        
         # Get all assignments for this channel
         assignments = bot.assignments.get_all_assignments(channel.id)
         
+        # Purge assignments to threads that were archived, deleted or solved
+        threads_by_id = {thread.id: thread for thread in channel.threads}
+        stale = [
+            thread_id for thread_id in assignments
+            if thread_id not in threads_by_id or threads_by_id[thread_id].name.startswith("[SOLVED]")
+        ]
+        if stale:
+            bot.assignments.remove_threads(channel.id, stale)
+            logger.debug(f"Purged {len(stale)} stale threads from assignments in {channel.name}")
+            assignments = bot.assignments.get_all_assignments(channel.id)
+        
+        # Keep only assignments to active, unsolved threads
+        active = [
+            (thread, user_ids) for thread_id, user_ids in assignments.items()
+            if user_ids
+            and (thread := threads_by_id.get(thread_id))
+            and not thread.name.startswith("[SOLVED]")
+        ]
+        
         # Create the embed
         embed = discord.Embed(
             title="👥 Current Challenge Assignments",
             color=discord.Color.purple()
         )
         
-        if not assignments:
+        if not active:
             embed.description = "No challenges are currently being worked on."
         else:
             embed.description = "Here's who's working on what:"
             
-            for thread_id, user_ids in assignments.items():
-                if not user_ids:
-                    continue
-                
-                # Get the thread
-                thread = channel.get_thread(thread_id)
-                if not thread or "[SOLVED]" in thread.name:
-                    continue
-                
+            for thread, user_ids in active:
                 # Get user mentions
-                user_mentions = []
-                for user_id in user_ids:
-                    user = bot.get_user(user_id)
-                    if user:
-                        user_mentions.append(user.mention)
+                user_mentions = get_user_mentions(channel.guild, user_ids)
                 
-                if user_mentions:
-                    embed.add_field(
-                        name=thread.name,
-                        value=f"[Thread]({thread.jump_url})\n" + "\n".join(user_mentions),
-                        inline=True
-                    )
+                embed.add_field(
+                    name=thread.name,
+                    value=f"[Thread]({thread.jump_url})\n" + "\n".join(user_mentions),
+                    inline=True
+                )
         
-        # Send or update the message
-        if summary_message:
-            await summary_message.edit(embed=embed)
-        else:
+        # Check if we have a summary message ID
+        summary_id = bot.assignments.get_summary_message(channel.id)
+        summary_message = None
+        
+        # Skip the edit if the summary hasn't changed since it was last posted
+        payload_hash = hash((embed.description, tuple((field.name, field.value) for field in embed.fields)))
+        if summary_id and _summary_hashes.get(channel.id) == (summary_id, payload_hash):
+            return channel.get_partial_message(summary_id)
+        
+        # Edit the known summary directly, without fetching it first
+        if summary_id:
+            try:
+                summary_message = await channel.get_partial_message(summary_id).edit(embed=embed)
+            except discord.NotFound:
+                # Message was deleted, we'll create a new one
+                pass
+        
+        if not summary_message:
             summary_message = await channel.send(embed=embed)
             bot.assignments.set_summary_message(channel.id, summary_message.id)
         
+        _summary_hashes[channel.id] = (summary_message.id, payload_hash)
         return summary_message
     
     except Exception as e:
@@ -4,6 +4,11 @@ import logging
 import traceback
 import re
 import asyncio
+import time
+import sys
+from functools import lru_cache
+from datetime import timedelta
+from ._checks import guard_ctf_command
 
 # Function to get a logger
 def get_logger():
@@ -11,6 +16,29 @@ def get_logger():
 
 logger = get_logger()
 
+# Seconds to reuse a channel's existing challenge names before rescanning its threads
+CHALLENGE_CACHE_TTL = 60
+
+# Also reject names used by archived threads (requires paging through them)
+INCLUDE_ARCHIVED = False
+
+# Normalized challenge names per channel, {channel_id: (expiry, {name, ...})}
+_challenge_cache = {}
+
+# Patterns used to normalize and validate names
+_STRIP_PUNCT = re.compile(r'[^\w\s]')
+_COLLAPSE_WS = re.compile(r'\s+')
+_SAFE_NAME = re.compile(r'[^\w\s-]')
+
+@lru_cache(maxsize=4096)
+def normalize_name(name):
+    """
+    Normalize a challenge name for duplicate comparison
+    """
+    # Remove special characters, convert to lowercase, remove extra spaces
+    # (interned so duplicate checks can compare by identity)
+    return sys.intern(_COLLAPSE_WS.sub(' ', _STRIP_PUNCT.sub('', name).lower()).strip())
+
 def truncate_text(text, max_length=1024):
     """
     Truncate text to max_length and add ellipsis if needed
@@ -23,83 +51,111 @@ def truncate_text(text, max_length=1024):
     
     return text[:max_length-3] + "..."
 
-async def cleanup_thread_messages(channel, bot_id):
+async def cleanup_thread_messages(channel):
     """
-    Clean up the 'Bot started a thread' messages
+    Clean up the 'Bot started a thread' messages among the channel's last few messages
     """
     try:
-        # Get recent messages and find the thread starter messages
-        async for message in channel.history(limit=100):
-            # Check if it's a system message about thread creation
-            if message.type == discord.MessageType.thread_created:
-                try:
-                    # Delete the message
-                    await message.delete()
-                    await asyncio.sleep(0.5)  # Small delay to prevent rate limiting
-                except discord.Forbidden:
-                    logger.warning("Bot does not have permission to delete messages")
-                    return False
-                except Exception as e:
-                    logger.warning(f"Error deleting message: {str(e)}")
-                    continue
+        # The notification is posted right after the thread is created, so it
+        # is among the last few messages in the channel (along with any left
+        # over from earlier challenges)
+        to_delete = [
+            message async for message in channel.history(limit=3)
+            if message.type == discord.MessageType.thread_created
+        ]
+        
+        # Bulk deletion only works for messages newer than 14 days
+        cutoff = discord.utils.utcnow() - timedelta(days=14)
+        recent = [message for message in to_delete if message.created_at > cutoff]
+        if recent:
+            await channel.delete_messages(recent)
+        for message in to_delete:
+            if message.created_at <= cutoff:
+                await message.delete()
         
         return True
+    except discord.Forbidden:
+        logger.warning("Bot does not have permission to delete messages")
+        return False
     except Exception as e:
         logger.error(f"Error in cleanup_thread_messages: {str(e)}")
         return False
 
+def thread_challenge_name(thread_name):
+    """
+    Get the normalized challenge name from a thread name
+    """
+    # Thread names are typically in the format "[Category] Challenge Name"
+    if "]" in thread_name:
+        # Extract just the challenge name part
+        return normalize_name(thread_name.split("]", 1)[1].strip())
+    # If no category prefix, just use the whole name
+    return normalize_name(thread_name)
+
 async def get_existing_challenges(channel):
     """
     Get a set of existing challenge names from the channel's threads
     with improved detection for special characters
     """
+    # Reuse the names from a recent scan of this channel
+    cached = _challenge_cache.get(channel.id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    
     existing_challenges = set()
     processed_threads = []
     
-    # Helper function to normalize challenge names for comparison
-    def normalize_name(name):
-        # Remove special characters, convert to lowercase
-        normalized = re.sub(r'[^\w\s]', '', name).lower()
-        # Remove extra spaces
-        normalized = re.sub(r'\s+', ' ', normalized).strip()
-        return normalized
-    
     # Collect all active threads
     for thread in channel.threads:
-        thread_name = thread.name
-        processed_threads.append(thread_name)
-        
-        # Extract challenge name from thread name - typically in format "[Category] Challenge Name"
-        if "]" in thread_name:
-            # Extract just the challenge name part
-            challenge_name = thread_name.split("]", 1)[1].strip()
-            existing_challenges.add(normalize_name(challenge_name))
-        else:
-            # If no category prefix, just use the whole name
-            existing_challenges.add(normalize_name(thread_name))
+        processed_threads.append(thread.name)
+        existing_challenges.add(thread_challenge_name(thread.name))
     
     # Also check archived threads
-    async for thread in channel.archived_threads():
-        thread_name = thread.name
-        processed_threads.append(thread_name)
-        
-        if "]" in thread_name:
-            challenge_name = thread_name.split("]", 1)[1].strip()
-            existing_challenges.add(normalize_name(challenge_name))
-        else:
-            existing_challenges.add(normalize_name(thread_name))
+    if INCLUDE_ARCHIVED:
+        async for thread in channel.archived_threads():
+            processed_threads.append(thread.name)
+            existing_challenges.add(thread_challenge_name(thread.name))
     
     # Log for debugging
-    logger.info(f"Found threads: {', '.join(processed_threads)}")
-    logger.info(f"Normalized challenge names: {', '.join(existing_challenges)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Found threads: {', '.join(processed_threads)}")
+        logger.debug(f"Normalized challenge names: {', '.join(existing_challenges)}")
     
+    existing_challenges = frozenset(existing_challenges)
+    _challenge_cache[channel.id] = (time.monotonic() + CHALLENGE_CACHE_TTL, existing_challenges)
     return existing_challenges
 
+def remember_challenge(channel_id, normalized_name):
+    """
+    Add a newly created challenge to the channel's cached names
+    """
+    cached = _challenge_cache.get(channel_id)
+    if cached:
+        _challenge_cache[channel_id] = (cached[0], cached[1] | {normalized_name})
+
 def setup(bot, guild_id, check_permissions):
+    guild = discord.Object(id=guild_id)
+    
+    # Threads made elsewhere (e.g. the CTFd and rCTF imports) are added to
+    # the cached names as they are created
+    @bot.listen("on_thread_create")
+    async def remember_on_thread_create(thread):
+        remember_challenge(thread.parent_id, thread_challenge_name(thread.name))
+    
+    # Rescan a channel's threads after one is deleted or renamed
+    @bot.listen("on_thread_delete")
+    async def invalidate_on_thread_delete(thread):
+        _challenge_cache.pop(thread.parent_id, None)
+    
+    @bot.listen("on_thread_update")
+    async def invalidate_on_thread_update(before, after):
+        if before.name != after.name:
+            _challenge_cache.pop(after.parent_id, None)
+    
     @bot.tree.command(
         name="ctf_add_challenge",
         description="Add a single challenge with custom details and create a thread for it",
-        guild=discord.Object(id=guild_id)
+        guild=guild
     )
     async def add_challenge(
         interaction: discord.Interaction,
@@ -114,46 +170,26 @@ def setup(bot, guild_id, check_permissions):
             'send_messages_in_threads', 'embed_links', 'manage_messages'
         ]
         
-        # Check permissions
-        perm_check = check_permissions(interaction.guild, interaction.guild.me, required_permissions)
-        missing_perms = [perm for perm, has_perm in perm_check.items() if not has_perm]
-        
-        if missing_perms:
-            logger.error(f"Missing permissions for add_challenge command: {', '.join(missing_perms)}")
-            await interaction.response.send_message(f"Bot is missing required permissions: {', '.join(missing_perms)}", ephemeral=True)
-            return
-
-        logger.info(f"Command 'ctf_add_challenge' used by {interaction.user.name}#{interaction.user.discriminator} (ID: {interaction.user.id})")
-        
         # Only allow this command to be used in CTF channels
         channel = interaction.channel
         
-        # Check if the channel is in a category
-        if not channel.category:
-            await interaction.response.send_message(
-                "This command can only be used in channels within a CTF category!",
-                ephemeral=True
-            )
-            return
-            
-        # Check if the category name follows the pattern "YYYY CTFs" (e.g., "2025 CTFs")
-        category_name = channel.category.name
-        if not re.match(r'^\d{4}\s+CTFs$', category_name):
-            await interaction.response.send_message(
-                f"This command can only be used in channels within a CTF category (e.g., '2025 CTFs')!",
-                ephemeral=True
-            )
+        # Check permissions and that the category follows the "YYYY CTFs" pattern
+        if not await guard_ctf_command(interaction, check_permissions, required_permissions, "add_challenge", channel):
             return
+
+        logger.info(f"Command 'ctf_add_challenge' used by {interaction.user.name}#{interaction.user.discriminator} (ID: {interaction.user.id})")
         
         try:
-            await interaction.response.defer(ephemeral=True)
-            
-            # Get existing challenges to check for duplicates
-            existing_challenges = await get_existing_challenges(channel)
+            # Get existing challenges to check for duplicates, deferring the
+            # response while any archived threads are fetched
+            defer_task = asyncio.create_task(interaction.response.defer(ephemeral=True))
+            try:
+                existing_challenges = await get_existing_challenges(channel)
+            finally:
+                await defer_task
             
             # Check if challenge already exists
-            normalized_name = re.sub(r'[^\w\s]', '', name).lower()
-            normalized_name = re.sub(r'\s+', ' ', normalized_name).strip()
+            normalized_name = normalize_name(name)
             
             if normalized_name in existing_challenges:
                 await interaction.followup.send(
@@ -163,7 +199,7 @@ def setup(bot, guild_id, check_permissions):
                 return
             
             # Format the thread name
-            safe_name = re.sub(r'[^\w\s-]', '', name).strip()
+            safe_name = _SAFE_NAME.sub('', name).strip()
             thread_name = f"[{category}] {safe_name}"
             
             # Ensure the thread name is within Discord's length limit
@@ -177,6 +213,9 @@ def setup(bot, guild_id, check_permissions):
                 auto_archive_duration=10080  # 7 days
             )
             
+            # Remember the new challenge so the next call doesn't need a rescan
+            remember_challenge(channel.id, normalized_name)
+            
             # Prepare description
             if not description:
                 description = "No description provided."
@@ -207,24 +246,29 @@ def setup(bot, guild_id, check_permissions):
             # Add creator info
             challenge_embed.set_footer(text=f"Added by {interaction.user.display_name}")
             
-            # Send the challenge details in the thread
-            await thread.send(embed=challenge_embed)
-            
-            # Clean up the "Bot started a thread" messages
-            success = await cleanup_thread_messages(channel, interaction.client.user.id)
-            cleanup_status = ""
-            if not success:
-                cleanup_status = "\nCould not clean up the thread notification messages. Make sure the bot has 'Manage Messages' permission."
-            
             # Notify in the main channel
             notification_embed = discord.Embed(
                 title=f"New Challenge Added: {name}",
-                description=f"Category: **{category}**" + (f"\nPoints: **{points}**" if points > 0 else ""),
+                description=f"Category: **{category}**\nPoints: **{points}**" if points > 0 else f"Category: **{category}**",
                 color=discord.Color.blue()
             )
             notification_embed.set_footer(text=f"Added by {interaction.user.display_name}")
             
-            await channel.send(embed=notification_embed)
+            # Send the challenge details in the thread, post the notification and
+            # clean up the "Bot started a thread" messages at the same time
+            results = await asyncio.gather(
+                thread.send(embed=challenge_embed),
+                channel.send(embed=notification_embed),
+                cleanup_thread_messages(channel),
+                return_exceptions=True
+            )
+            for result in results[:2]:
+                if isinstance(result, BaseException):
+                    raise result
+            
+            cleanup_status = ""
+            if results[2] is not True:
+                cleanup_status = "\nCould not clean up the thread notification messages. Make sure the bot has 'Manage Messages' permission."
             
             # Success message to the user
             await interaction.followup.send(
@@ -1,8 +1,10 @@
 import discord
 from discord.ext import commands
 import logging
-import traceback
 from typing import Optional, Literal
+from db import get_welcome_message, save_welcome_message
+from ._checks import guard_ctf_command
+from ._embed_utils import upsert_field
 
 # Function to get a logger
 def get_logger():
@@ -10,11 +12,23 @@ def get_logger():
 
 logger = get_logger()
 
+_REQUIRED_PERMS = frozenset((
+    'view_channel', 'send_messages', 'embed_links', 'read_message_history'
+))
+
+# Messages fetched by each successive pass of the welcome embed history scan
+HISTORY_SCAN_LIMITS = (25, 75)
+
+# Welcome message IDs already looked up, {channel_id: message_id}
+_welcome_cache = {}
+
 def setup(bot, guild_id, check_permissions):
+    guild = discord.Object(id=guild_id)
+    
     @bot.tree.command(
         name="ctf_addcreds",
         description="Add credentials to an existing CTF channel",
-        guild=discord.Object(id=guild_id)
+        guild=guild
     )
     async def add_creds(
         interaction: discord.Interaction,
@@ -35,17 +49,11 @@ def setup(bot, guild_id, check_permissions):
         link: The direct login link/token for platforms like RCTF
         channel: The channel to add credentials to (defaults to current channel)
         """
-        required_permissions = [
-            'view_channel', 'send_messages', 'embed_links', 'read_message_history'
-        ]
-        
-        # Check permissions
-        perm_check = check_permissions(interaction.guild, interaction.guild.me, required_permissions)
-        missing_perms = [perm for perm, has_perm in perm_check.items() if not has_perm]
+        # Determine which channel to use
+        target_channel = channel if channel else interaction.channel
         
-        if missing_perms:
-            logger.error(f"Missing permissions for addcreds command: {', '.join(missing_perms)}")
-            await interaction.response.send_message(f"Bot is missing required permissions: {', '.join(missing_perms)}", ephemeral=True)
+        # Check permissions and that the channel is a CTF channel
+        if not await guard_ctf_command(interaction, check_permissions, _REQUIRED_PERMS, "addcreds", target_channel):
             return
 
         logger.info(f"Command 'addcreds' used by {interaction.user.name}#{interaction.user.discriminator} (ID: {interaction.user.id})")
@@ -67,23 +75,66 @@ def setup(bot, guild_id, check_permissions):
             
             await interaction.response.defer(ephemeral=True)
             
-            # Determine which channel to use
-            target_channel = channel if channel else interaction.channel
-            
-            # Check if the channel is a CTF channel
-            if not target_channel.category or not target_channel.category.name.endswith("CTFs"):
-                await interaction.followup.send("This command can only be used in a CTF channel!", ephemeral=True)
-                return
-            
-            # Look for the welcome embed message in the channel
+            # Fetch the welcome embed directly if we know which message it is
             welcome_message = None
-            async for message in target_channel.history(limit=100):
-                # Check if the message is from the bot and has an embed
-                if message.author == bot.user and message.embeds and len(message.embeds) > 0:
-                    embed = message.embeds[0]
-                    # Look for CTF welcome embeds by checking if they have a title and URL
-                    if embed.title and embed.url:
+            welcome_message_id = _welcome_cache.get(target_channel.id) or get_welcome_message(target_channel.id)
+            if welcome_message_id:
+                try:
+                    message = await target_channel.fetch_message(welcome_message_id)
+                    # The embed may have been suppressed or removed since it was stored
+                    if message.embeds:
                         welcome_message = message
+                    else:
+                        logger.warning(f"Stored welcome message {welcome_message_id} in {target_channel.name} has no embed")
+                        _welcome_cache.pop(target_channel.id, None)
+                except discord.NotFound:
+                    logger.warning(f"Stored welcome message {welcome_message_id} not found in {target_channel.name}")
+                    _welcome_cache.pop(target_channel.id, None)
+            
+            # Otherwise look for the welcome embed in the bot's message cache
+            if not welcome_message:
+                cached_candidates = [
+                    m for m in bot.cached_messages
+                    if m.channel.id == target_channel.id
+                    and m.author.id == bot.user.id
+                    and m.embeds
+                    and m.embeds[0].title
+                    and m.embeds[0].url
+                ]
+                if cached_candidates:
+                    # The welcome embed is posted once when the channel is created
+                    welcome_message = min(cached_candidates, key=lambda m: m.created_at)
+            
+            # A channel that has never had a message can't hold a welcome embed,
+            # so skip the pin and history lookups and create one straight away
+            channel_is_empty = target_channel.last_message_id is None
+            
+            # Then check the pinned messages, where ctf_setup pins the welcome embed
+            if not welcome_message and not channel_is_empty:
+                for message in await target_channel.pins():
+                    if message.author == bot.user and message.embeds and message.embeds[0].title and message.embeds[0].url:
+                        welcome_message = message
+                        break
+            
+            # Fall back to scanning the channel history from the start, where
+            # the welcome embed is posted
+            if not welcome_message and not channel_is_empty:
+                # Try a small first page, only widening the scan if it misses
+                last_message = None
+                for limit in HISTORY_SCAN_LIMITS:
+                    fetched = 0
+                    async for message in target_channel.history(limit=limit, after=last_message, oldest_first=True):
+                        last_message = message
+                        fetched += 1
+                        # Check if the message is from the bot and has an embed
+                        if message.author == bot.user and message.embeds and len(message.embeds) > 0:
+                            embed = message.embeds[0]
+                            # Look for CTF welcome embeds by checking if they have a title and URL
+                            if embed.title and embed.url:
+                                welcome_message = message
+                                break
+                    # Stop once found or when the channel has no more messages
+                    if welcome_message or fetched < limit:
                         break
             
             if not welcome_message:
@@ -96,12 +147,24 @@ def setup(bot, guild_id, check_permissions):
                     url=link if type == 'link' else "https://ctftime.org/"
                 )
                 welcome_message = await target_channel.send(embed=embed)
-            
-            # Get the existing embed
-            embed = welcome_message.embeds[0]
-            
-            # Create a copy of the embed
-            new_embed = discord.Embed.from_dict(embed.to_dict())
+                
+                # Pin it so later lookups find it without scanning the history
+                try:
+                    await welcome_message.pin(reason="CTF welcome message")
+                except discord.HTTPException as e:
+                    logger.warning(f"Could not pin welcome message in channel {target_channel.name}: {str(e)}")
+            
+            if welcome_message.id != welcome_message_id:
+                # Storing the ID only speeds up later lookups, so a failed write
+                # shouldn't stop the credentials from being added
+                try:
+                    save_welcome_message(target_channel.id, welcome_message.id)
+                except Exception:
+                    logger.exception(f"Could not save welcome message {welcome_message.id} for channel {target_channel.name}")
+            _welcome_cache[target_channel.id] = welcome_message.id
+            
+            # Edit the existing embed in place; it is replaced by the edit below
+            new_embed = welcome_message.embeds[0]
             
             # Format credentials based on type
             if type == 'team':
@@ -117,27 +180,8 @@ def setup(bot, guild_id, check_permissions):
                 if new_embed.title and "Information" in new_embed.title:
                     new_embed.url = link
             
-            # Check if credentials field already exists
-            field_found = False
-            for i, field in enumerate(new_embed.fields):
-                if field.name == field_name:
-                    # Update existing field
-                    new_embed.set_field_at(
-                        i,
-                        name=field_name,
-                        value=creds_value,
-                        inline=False
-                    )
-                    field_found = True
-                    break
-            
-            # If no credentials field exists, add a new one
-            if not field_found:
-                new_embed.add_field(
-                    name=field_name,
-                    value=creds_value,
-                    inline=False
-                )
+            # Update the credentials field, adding it if it doesn't exist yet
+            upsert_field(new_embed, field_name, creds_value)
             
             # Update the message
             await welcome_message.edit(embed=new_embed)
@@ -157,6 +201,5 @@ def setup(bot, guild_id, check_permissions):
             logger.info(f"Added {type} credentials to CTF channel {target_channel.name} by {interaction.user.name}#{interaction.user.discriminator}")
             
         except Exception as e:
-            error_traceback = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
-            logger.error(f"Error in addcreds command:\n{error_traceback}")
+            logger.exception("Error in addcreds command")
             await interaction.followup.send(f"Error adding credentials: {str(e)}", ephemeral=True)
\ No newline at end of file
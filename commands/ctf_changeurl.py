@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 import logging
-import traceback
+import asyncio
 from typing import Optional
 
 # Function to get a logger
@@ -10,6 +10,42 @@ def get_logger():
 
 logger = get_logger()
 
+_REQUIRED_PERMS = (
+    'view_channel', 'send_messages', 'embed_links', 'read_message_history', 'manage_messages'
+)
+
+_NOT_CTF_CHANNEL_MSG = "This command can only be used in a CTF channel!"
+
+# Most recent messages searched for CTF embeds
+HISTORY_LIMIT = 50
+
+# Stop searching once both special embeds and this many CTF embeds are found
+EMBEDS_WANTED = 3
+
+# Embed field names (lowercased) that hold the CTF URL
+_URL_FIELD_NAMES = frozenset(('ctf_url', 'ctf url', 'url'))
+
+def build_url_embed(embed, new_url):
+    """
+    Set a CTF embed's URL (and URL field, if any) to new_url, editing it in place
+    """
+    embed.url = new_url
+    
+    # Update CTF URL field if it exists
+    fields = embed.fields
+    for i in range(len(fields)):
+        field = fields[i]
+        if field.name.lower() in _URL_FIELD_NAMES:
+            embed.set_field_at(
+                i,
+                name=field.name,
+                value=new_url,
+                inline=field.inline
+            )
+            break
+    
+    return embed
+
 def setup(bot, guild_id, check_permissions):
     @bot.tree.command(
         name="ctf_changeurl",
@@ -29,25 +65,21 @@ def setup(bot, guild_id, check_permissions):
         new_url: The new URL to set for the CTF
         channel: The CTF channel to update (defaults to current channel)
         """
-        required_permissions = [
-            'view_channel', 'send_messages', 'embed_links', 'read_message_history', 'manage_messages'
-        ]
-        
         # Check permissions
-        perm_check = check_permissions(interaction.guild, interaction.guild.me, required_permissions)
-        missing_perms = [perm for perm, has_perm in perm_check.items() if not has_perm]
-        
-        if missing_perms:
-            logger.error(f"Missing permissions for changeurl command: {', '.join(missing_perms)}")
+        perm_check = check_permissions(interaction.guild, interaction.guild.me, _REQUIRED_PERMS)
+        if not all(perm_check.values()):
+            missing_perms = [perm for perm, has_perm in perm_check.items() if not has_perm]
+            logger.error("Missing permissions for changeurl command: %s", ', '.join(missing_perms))
             await interaction.response.send_message(f"Bot is missing required permissions: {', '.join(missing_perms)}", ephemeral=True)
             return
 
-        logger.info(f"Command 'changeurl' used by {interaction.user.name}#{interaction.user.discriminator} (ID: {interaction.user.id})")
-        logger.info(f"Change URL Parameters: new_url={new_url}, channel={channel.name if channel else 'current'}")
+        user = interaction.user
+        logger.info("Command 'changeurl' used by %s#%s (ID: %s)", user.name, user.discriminator, user.id)
+        logger.info("Change URL Parameters: new_url=%s, channel=%s", new_url, channel.name if channel else 'current')
         
         try:
             # Check if user has permission to manage channels
-            if not interaction.user.guild_permissions.manage_channels:
+            if not user.guild_permissions.manage_channels:
                 await interaction.response.send_message("You don't have permission to change CTF URLs!", ephemeral=True)
                 return
             
@@ -56,133 +88,78 @@ def setup(bot, guild_id, check_permissions):
                 await interaction.response.send_message("Please provide a valid URL starting with http:// or https://", ephemeral=True)
                 return
             
-            await interaction.response.defer(ephemeral=True)
-            
             # Determine which channel to use
             target_channel = channel if channel else interaction.channel
             
             # Check if the channel is a CTF channel
-            if not target_channel.category or not target_channel.category.name.endswith("CTFs"):
-                await interaction.followup.send("This command can only be used in a CTF channel!", ephemeral=True)
+            category = target_channel.category
+            if category is None or not category.name.endswith("CTFs"):
+                await interaction.response.send_message(_NOT_CTF_CHANNEL_MSG, ephemeral=True)
                 return
             
-            logger.info(f"Searching for CTF embed in channel: {target_channel.name}")
+            await interaction.response.defer(ephemeral=True)
+            
+            logger.info("Searching for CTF embed in channel: %s", target_channel.name)
             
             # Look for CTF embed messages in the channel
             ctf_embeds_found = []
             reaction_embed = None
             welcome_embed = None
+            ctf_name = None
             
-            async for message in target_channel.history(limit=100):
-                # Check if the message is from the bot and has an embed
-                if message.author == bot.user and message.embeds and len(message.embeds) > 0:
-                    embed = message.embeds[0]
-                    
-                    # Check if this is a reaction role message (has reactions)
-                    if message.reactions:
-                        for reaction in message.reactions:
-                            if str(reaction.emoji) == '✅':
-                                reaction_embed = message
-                                logger.info(f"Found reaction role embed: {embed.title}")
-                                break
-                    
-                    # Check if this is a welcome/info embed (first embed without reactions, or with title containing CTF info)
-                    elif embed.title and not welcome_embed:
-                        welcome_embed = message
-                        logger.info(f"Found welcome embed: {embed.title}")
-                    
-                    # Add to list of found embeds
-                    if embed.title:
-                        ctf_embeds_found.append(message)
+            bot_user_id = bot.user.id
+            async for message in target_channel.history(limit=HISTORY_LIMIT):
+                # Only titled embeds posted by the bot are CTF embeds
+                if message.author.id != bot_user_id or not message.embeds:
+                    continue
+                embed = message.embeds[0]
+                if not embed.title:
+                    continue
+                
+                # Add to list of found embeds
+                ctf_embeds_found.append(message)
+                
+                # Check if this is a reaction role message (has reactions)
+                if message.reactions:
+                    if reaction_embed is None and any(str(reaction.emoji) == '✅' for reaction in message.reactions):
+                        reaction_embed = message
+                        ctf_name = embed.title
+                        logger.info("Found reaction role embed: %s", embed.title)
+                
+                # Check if this is a welcome/info embed
+                elif welcome_embed is None:
+                    welcome_embed = message
+                    ctf_name = ctf_name or embed.title
+                    logger.info("Found welcome embed: %s", embed.title)
+                
+                # Stop paging through history once everything is found
+                if reaction_embed and welcome_embed and len(ctf_embeds_found) >= EMBEDS_WANTED:
+                    break
             
             if not ctf_embeds_found:
                 await interaction.followup.send("No CTF embeds found in this channel!", ephemeral=True)
                 return
             
-            logger.info(f"Found {len(ctf_embeds_found)} CTF embeds to update")
+            logger.info("Found %s CTF embeds to update", len(ctf_embeds_found))
             
             updated_count = 0
             
-            # Update the reaction role embed first (if found)
-            if reaction_embed:
-                try:
-                    embed = reaction_embed.embeds[0]
-                    new_embed = discord.Embed.from_dict(embed.to_dict())
-                    new_embed.url = new_url
-                    
-                    # Update CTF URL field if it exists
-                    for i, field in enumerate(new_embed.fields):
-                        if field.name.lower() in ['ctf_url', 'ctf url', 'url']:
-                            new_embed.set_field_at(
-                                i,
-                                name=field.name,
-                                value=new_url,
-                                inline=field.inline
-                            )
-                            break
-                    
-                    await reaction_embed.edit(embed=new_embed)
-                    updated_count += 1
-                    logger.info(f"Updated reaction role embed with new URL: {new_url}")
-                except Exception as e:
-                    logger.error(f"Error updating reaction embed: {str(e)}")
-            
-            # Update the welcome embed (if found and different from reaction embed)
-            if welcome_embed and welcome_embed != reaction_embed:
-                try:
-                    embed = welcome_embed.embeds[0]
-                    new_embed = discord.Embed.from_dict(embed.to_dict())
-                    new_embed.url = new_url
-                    
-                    # Update CTF URL field if it exists
-                    for i, field in enumerate(new_embed.fields):
-                        if field.name.lower() in ['ctf_url', 'ctf url', 'url']:
-                            new_embed.set_field_at(
-                                i,
-                                name=field.name,
-                                value=new_url,
-                                inline=field.inline
-                            )
-                            break
-                    
-                    await welcome_embed.edit(embed=new_embed)
+            # Update every CTF embed found, including the reaction role and welcome
+            # embeds, sending the edits concurrently
+            results = await asyncio.gather(
+                *(message.edit(embed=build_url_embed(message.embeds[0], new_url)) for message in ctf_embeds_found),
+                return_exceptions=True
+            )
+            for message, result in zip(ctf_embeds_found, results):
+                if isinstance(result, BaseException):
+                    logger.error("Error updating embed in message %s: %s", message.id, result)
+                else:
                     updated_count += 1
-                    logger.info(f"Updated welcome embed with new URL: {new_url}")
-                except Exception as e:
-                    logger.error(f"Error updating welcome embed: {str(e)}")
-            
-            # Update any other CTF embeds found
-            for message in ctf_embeds_found:
-                if message != reaction_embed and message != welcome_embed:
-                    try:
-                        embed = message.embeds[0]
-                        new_embed = discord.Embed.from_dict(embed.to_dict())
-                        new_embed.url = new_url
-                        
-                        # Update CTF URL field if it exists
-                        for i, field in enumerate(new_embed.fields):
-                            if field.name.lower() in ['ctf_url', 'ctf url', 'url']:
-                                new_embed.set_field_at(
-                                    i,
-                                    name=field.name,
-                                    value=new_url,
-                                    inline=field.inline
-                                )
-                                break
-                        
-                        await message.edit(embed=new_embed)
-                        updated_count += 1
-                        logger.info(f"Updated additional embed with new URL: {new_url}")
-                    except Exception as e:
-                        logger.error(f"Error updating additional embed: {str(e)}")
+                    logger.info("Updated embed in message %s with new URL: %s", message.id, new_url)
             
             if updated_count > 0:
-                # Get CTF name from the channel or embed
-                ctf_name = target_channel.name
-                if reaction_embed and reaction_embed.embeds:
-                    ctf_name = reaction_embed.embeds[0].title or ctf_name
-                elif welcome_embed and welcome_embed.embeds:
-                    ctf_name = welcome_embed.embeds[0].title or ctf_name
+                # Get CTF name from the embeds (reaction role first) or the channel
+                ctf_name = ctf_name or target_channel.name
                 
                 # Send confirmation
                 if updated_count == 1:
@@ -191,11 +168,13 @@ def setup(bot, guild_id, check_permissions):
                     confirm_msg = f"Updated {updated_count} embeds for **{ctf_name}** with new URL: {new_url}"
                 
                 await interaction.followup.send(confirm_msg)
-                logger.info(f"Successfully updated {updated_count} CTF embeds in {target_channel.name} with URL {new_url} by {interaction.user.name}#{interaction.user.discriminator}")
+                logger.info("Successfully updated %s CTF embeds in %s with URL %s by %s#%s", updated_count, target_channel.name, new_url, user.name, user.discriminator)
             else:
                 await interaction.followup.send("No embeds were updated. Please check if the channel contains valid CTF embeds.", ephemeral=True)
                 
         except Exception as e:
-            error_traceback = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
-            logger.error(f"Error in changeurl command:\n{error_traceback}")
-            await interaction.followup.send(f"Error changing CTF URL: {str(e)}", ephemeral=True)
\ No newline at end of file
+            logger.exception("Error in changeurl command")
+            try:
+                await interaction.followup.send(f"Error changing CTF URL: {str(e)}", ephemeral=True)
+            except discord.HTTPException:
+                pass
\ No newline at end of file
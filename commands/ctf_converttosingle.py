@@ -1,11 +1,11 @@
 import discord
 from discord.ext import commands
 import logging
-import traceback
 import re
+import asyncio
 from typing import Optional
 from db import (save_reaction_role, get_team_info, save_team_info, get_team_members, 
-                remove_team_member, cleanup_ctf_data, get_ctf_by_channel,
+                cleanup_ctf_data, delete_team_records, get_ctf_by_channel,
                 get_reaction_message_channel)
 
 # Function to get a logger
@@ -14,6 +14,26 @@ def get_logger():
 
 logger = get_logger()
 
+# Characters stripped from team channel names
+_SANITIZE = re.compile(r'[^a-zA-Z0-9_-]')
+
+# Main channel overwrites that don't depend on the CTF
+_DEFAULT_DENY = discord.PermissionOverwrite(
+    read_messages=False,
+    send_messages=False
+)
+_BOT_OVERWRITE = discord.PermissionOverwrite(
+    view_channel=True,
+    read_messages=True,
+    send_messages=True,
+    create_public_threads=True,
+    send_messages_in_threads=True,
+    embed_links=True,
+    attach_files=True,
+    add_reactions=True,
+    manage_messages=True
+)
+
 def setup(bot, guild_id, check_permissions):
     @bot.tree.command(
         name="ctf_converttosingle",
@@ -42,12 +62,12 @@ def setup(bot, guild_id, check_permissions):
         missing_perms = [perm for perm, has_perm in perm_check.items() if not has_perm]
         
         if missing_perms:
-            logger.error(f"Missing permissions for converttosingle command: {', '.join(missing_perms)}")
+            logger.error("Missing permissions for converttosingle command: %s", ', '.join(missing_perms))
             await interaction.response.send_message(f"Bot is missing required permissions: {', '.join(missing_perms)}", ephemeral=True)
             return
 
-        logger.info(f"Command 'converttosingle' used by {interaction.user.name}#{interaction.user.discriminator} (ID: {interaction.user.id})")
-        logger.info(f"Convert to Single Parameters: channel={channel.name if channel else 'current'}")
+        logger.info("Command 'converttosingle' used by %s#%s (ID: %s)", interaction.user.name, interaction.user.discriminator, interaction.user.id)
+        logger.info("Convert to Single Parameters: channel=%s", channel.name if channel else 'current')
         
         try:
             # Check if user has permission to manage roles
@@ -65,35 +85,44 @@ def setup(bot, guild_id, check_permissions):
                 await interaction.followup.send("This command can only be used in a CTF channel!", ephemeral=True)
                 return
             
-            logger.info(f"Looking up CTF by channel ID: {target_channel.id}")
+            logger.info("Looking up CTF by channel ID: %s", target_channel.id)
             
-            # Look up CTF directly by channel ID in database
-            message_id = get_ctf_by_channel(target_channel.id)
+            # Look up CTF by channel ID in memory, then in the database
+            message_id = bot.ctf_cache.get(target_channel.id)
+            if not message_id:
+                message_id = get_ctf_by_channel(target_channel.id)
+                if message_id:
+                    bot.ctf_cache[target_channel.id] = message_id
             
             if not message_id:
-                error_msg = "No CTF found for this channel in the database!\n\n"
-                error_msg += "**Debugging info:**\n"
-                error_msg += f"• Current channel: `{target_channel.name}` (ID: {target_channel.id})\n"
-                error_msg += f"• Category: `{target_channel.category.name}`\n\n"
-                error_msg += "**Possible reasons:**\n"
-                error_msg += "• This CTF was created before channel tracking was implemented\n"
-                error_msg += "• This channel is not the main CTF channel\n"
-                error_msg += "• The CTF was set up differently\n\n"
-                error_msg += "**Solution:**\n"
-                error_msg += "Try running this command from the main CTF channel (where the reaction message is posted)."
+                error_msg = "\n".join([
+                    "No CTF found for this channel in the database!",
+                    "",
+                    "**Debugging info:**",
+                    f"• Current channel: `{target_channel.name}` (ID: {target_channel.id})",
+                    f"• Category: `{target_channel.category.name}`",
+                    "",
+                    "**Possible reasons:**",
+                    "• This CTF was created before channel tracking was implemented",
+                    "• This channel is not the main CTF channel",
+                    "• The CTF was set up differently",
+                    "",
+                    "**Solution:**",
+                    "Try running this command from the main CTF channel (where the reaction message is posted)."
+                ])
                 
                 await interaction.followup.send(error_msg, ephemeral=True)
                 return
             
-            logger.info(f"Found CTF message {message_id} for channel {target_channel.id}")
+            logger.info("Found CTF message %s for channel %s", message_id, target_channel.id)
             
             # Check if it's a team-based CTF
-            if message_id not in bot.reaction_roles:
+            role_data = bot.reaction_roles.get(message_id)
+            if role_data is None:
                 await interaction.followup.send("CTF configuration not found in bot memory. Try restarting the bot.", ephemeral=True)
                 return
             
-            role_data = bot.reaction_roles[message_id]
-            logger.info(f"Role data for message {message_id}: {role_data}")
+            logger.info("Role data for message %s: %s", message_id, role_data)
             
             if 'team_config' not in role_data:
                 await interaction.followup.send("This CTF is not team-based! It's already a traditional single-role CTF.", ephemeral=True)
@@ -112,7 +141,7 @@ def setup(bot, guild_id, check_permissions):
                 await interaction.followup.send("Event role not found! The role may have been deleted.", ephemeral=True)
                 return
             
-            logger.info(f"Converting team-based CTF: {team_config['ctf_name']} with event role: {event_role.name}")
+            logger.info("Converting team-based CTF: %s with event role: %s", team_config['ctf_name'], event_role.name)
             
             # Get all team members and their teams
             all_teams = get_team_members(message_id)
@@ -120,219 +149,233 @@ def setup(bot, guild_id, check_permissions):
             if not all_teams:
                 logger.info("No teams found, just converting configuration")
             else:
-                logger.info(f"Found {len(all_teams)} teams to clean up: {list(all_teams.keys())}")
+                logger.info("Found %s teams to clean up: %s", len(all_teams), list(all_teams.keys()))
             
             guild = interaction.guild
             category = guild.get_channel(team_config['category_id'])
             
             # Collect all team members for summary
-            total_members = 0
-            teams_deleted = []
+            total_members = sum(len(members) for members in all_teams.values())
+            teams_deleted = list(all_teams.keys())
             
-            # Clean up all team roles and channels
-            for team_num, members in all_teams.items():
-                logger.info(f"Cleaning up team {team_num} with {len(members)} members")
-                
-                total_members += len(members)
-                teams_deleted.append(team_num)
+            # Index roles and channels by name once instead of scanning them for
+            # every team; built in reverse so the first match wins, as with utils.get
+            roles_by_name = {role.name: role for role in reversed(guild.roles)}
+            if category is None:
+                # The category is gone, so there are no team channels left to delete
+                logger.warning("Team category %s not found, skipping team channel cleanup", team_config['category_id'])
+                channels_by_name = {}
+            else:
+                channels_by_name = {c.name: c for c in reversed(category.channels)}
+            
+            # Team names only differ by number, so build the shared prefixes once
+            ctf_lower = team_config['ctf_name'].lower()
+            role_prefix = f"{ctf_lower}-team-"
+            channel_prefix = _SANITIZE.sub('', f"{ctf_lower.replace(' ', '-')}-team-")
+            
+            async def delete_team_object(obj, kind, name):
+                """Delete a team role or channel, logging rather than raising on failure"""
+                try:
+                    await obj.delete(reason="CTF converted to single-role format")
+                    logger.info("Deleted team %s: %s", kind, name)
+                except Exception as e:
+                    logger.error("Error deleting team %s %s: %s", kind, name, e)
+            
+            async def cleanup_team(team_num, members):
+                """Delete a team's role and channel concurrently"""
+                logger.info("Cleaning up team %s with %s members", team_num, len(members))
+                deletions = []
                 
-                # Remove team role from all members (they keep the event role)
-                team_role_name = f"{team_config['ctf_name'].lower()}-team-{team_num}"
-                team_role = discord.utils.get(guild.roles, name=team_role_name)
+                # Delete the team role; Discord removes it from every member
+                # (they keep the event role), so no per-member edits are needed
+                team_role_name = f"{role_prefix}{team_num}"
+                team_role = roles_by_name.get(team_role_name)
                 
                 if team_role:
-                    for member_id in members:
-                        member = guild.get_member(member_id)
-                        if member:
-                            try:
-                                await member.remove_roles(team_role)
-                                logger.debug(f"Removed team role from user {member_id}")
-                                # Remove from database
-                                remove_team_member(message_id, member_id)
-                            except Exception as e:
-                                logger.error(f"Error removing team role from user {member_id}: {str(e)}")
-                    
-                    # Delete the team role
-                    try:
-                        await team_role.delete(reason="CTF converted to single-role format")
-                        logger.info(f"Deleted team role: {team_role_name}")
-                    except Exception as e:
-                        logger.error(f"Error deleting team role {team_role_name}: {str(e)}")
+                    deletions.append(delete_team_object(team_role, "role", team_role_name))
                 else:
-                    logger.warning(f"Team role {team_role_name} not found")
+                    logger.warning("Team role %s not found", team_role_name)
                 
                 # Delete the team channel
-                team_channel_name = f"{team_config['ctf_name'].lower().replace(' ', '-')}-team-{team_num}"
-                team_channel_name = re.sub(r'[^a-zA-Z0-9_-]', '', team_channel_name)
-                team_channel = discord.utils.get(category.channels, name=team_channel_name)
+                team_channel_name = f"{channel_prefix}{team_num}"
+                team_channel = channels_by_name.get(team_channel_name)
                 
                 if team_channel:
-                    try:
-                        await team_channel.delete(reason="CTF converted to single-role format")
-                        logger.info(f"Deleted team channel: {team_channel_name}")
-                    except Exception as e:
-                        logger.error(f"Error deleting team channel {team_channel_name}: {str(e)}")
+                    deletions.append(delete_team_object(team_channel, "channel", team_channel_name))
                 else:
-                    logger.warning(f"Team channel {team_channel_name} not found")
+                    logger.warning("Team channel %s not found", team_channel_name)
+                
+                await asyncio.gather(*deletions)
             
-            # Update the main channel permissions (event role gets full access)
-            try:
-                await target_channel.edit(overwrites={
-                    guild.default_role: discord.PermissionOverwrite(
-                        read_messages=False,
-                        send_messages=False
-                    ),
-                    event_role: discord.PermissionOverwrite(
-                        read_messages=True,
-                        send_messages=True,
-                        create_public_threads=True,
-                        send_messages_in_threads=True
-                    ),
-                    guild.me: discord.PermissionOverwrite(
-                        view_channel=True,
-                        read_messages=True,
-                        send_messages=True,
-                        create_public_threads=True,
-                        send_messages_in_threads=True,
-                        embed_links=True,
-                        attach_files=True,
-                        add_reactions=True,
-                        manage_messages=True
-                    )
-                })
-                logger.info("Updated main channel permissions for traditional CTF")
-            except Exception as e:
-                logger.error(f"Error updating main channel permissions: {str(e)}")
+            # Clean up all team roles and channels concurrently, so one failing
+            # team doesn't stop the others from being cleaned up
+            results = await asyncio.gather(
+                *(cleanup_team(team_num, members) for team_num, members in all_teams.items()),
+                return_exceptions=True
+            )
+            for team_num, result in zip(all_teams, results):
+                if isinstance(result, BaseException):
+                    logger.error("Error cleaning up team %s: %s", team_num, result)
             
-            # Update the reaction role configuration in database and memory
-            save_reaction_role(message_id, event_role.id, '✅', target_channel.id, role_data.get('reaction_message_channel_id'))
+            # Update the main channel permissions (event role gets full access).
+            # The team roles are already deleted above, taking their overwrites
+            # with them, so only these three entries are sent
+            overwrites = {
+                guild.default_role: _DEFAULT_DENY,
+                event_role: discord.PermissionOverwrite(
+                    read_messages=True,
+                    send_messages=True,
+                    create_public_threads=True,
+                    send_messages_in_threads=True
+                ),
+                guild.me: _BOT_OVERWRITE
+            }
+            if target_channel.overwrites == overwrites:
+                logger.info("Main channel permissions already match traditional CTF")
+            else:
+                try:
+                    await target_channel.edit(overwrites=overwrites)
+                    logger.info("Updated main channel permissions for traditional CTF")
+                except Exception as e:
+                    logger.error("Error updating main channel permissions: %s", e)
             
             # Remove team configuration from database
             try:
-                # Remove team config and team member records
-                conn = __import__('sqlite3').connect('ctf_bot.db')
-                c = conn.cursor()
-                c.execute('DELETE FROM team_configs WHERE message_id = ?', (message_id,))
-                c.execute('DELETE FROM team_members WHERE message_id = ?', (message_id,))
-                conn.commit()
-                conn.close()
+                # Remove team config and all team member records in one go
+                delete_team_records(message_id)
                 logger.info("Cleaned up team configuration from database")
             except Exception as e:
-                logger.error(f"Error cleaning up team configuration: {str(e)}")
+                logger.error("Error cleaning up team configuration: %s", e)
             
-            # Update bot memory to traditional CTF
-            bot.reaction_roles[message_id] = {
+            # Update bot memory to traditional CTF, swapping in the new entry whole;
+            # the database copy is saved after the reaction message is found
+            new_role_data = {
                 'role_id': event_role.id,
                 'emoji': '✅',
                 'channel_id': target_channel.id,
                 'reaction_message_channel_id': role_data.get('reaction_message_channel_id')
             }
+            bot.reaction_roles[message_id] = new_role_data
             
             logger.info("Updated reaction role configuration to traditional CTF")
             
             # Update the reaction message embed to reflect traditional nature
             try:
-                # Get the reaction message channel ID from database
-                reaction_message_channel_id = get_reaction_message_channel(message_id)
+                # Get the reaction message channel ID from memory, then the database
+                reaction_message_channel_id = bot.msg_channel_cache.get(message_id) or get_reaction_message_channel(message_id)
                 reaction_message = None
                 
                 if reaction_message_channel_id:
-                    logger.info(f"Found reaction message channel {reaction_message_channel_id} for message {message_id}")
+                    new_role_data['reaction_message_channel_id'] = reaction_message_channel_id
+                    logger.info("Found reaction message channel %s for message %s", reaction_message_channel_id, message_id)
                     reaction_message_channel = guild.get_channel(reaction_message_channel_id)
                     
                     if reaction_message_channel:
                         try:
                             reaction_message = await reaction_message_channel.fetch_message(message_id)
-                            logger.info(f"Successfully found reaction message {message_id} in channel {reaction_message_channel.name}")
+                            logger.info("Successfully found reaction message %s in channel %s", message_id, reaction_message_channel.name)
                         except discord.NotFound:
-                            logger.warning(f"Reaction message {message_id} not found in expected channel {reaction_message_channel.name}")
+                            logger.warning("Reaction message %s not found in expected channel %s", message_id, reaction_message_channel.name)
                             reaction_message = None
                         except Exception as e:
-                            logger.error(f"Error fetching reaction message {message_id}: {str(e)}")
+                            logger.error("Error fetching reaction message %s: %s", message_id, e)
                             reaction_message = None
                     else:
-                        logger.warning(f"Reaction message channel {reaction_message_channel_id} not found")
+                        logger.warning("Reaction message channel %s not found", reaction_message_channel_id)
                         reaction_message = None
                 else:
-                    logger.warning(f"No reaction message channel stored for message {message_id}, falling back to search")
+                    logger.warning("No reaction message channel stored for message %s, falling back to search", message_id)
                     # Fall back to searching all category channels if no stored channel
                     channels_searched = []
                     
                     for channel_to_search in target_channel.category.text_channels:
+                        # Skip channels an earlier search already found don't hold it
+                        if (message_id, channel_to_search.id) in bot.msg_channel_miss_cache:
+                            continue
                         channels_searched.append(channel_to_search.name)
                         try:
                             reaction_message = await channel_to_search.fetch_message(message_id)
-                            logger.info(f"Found reaction message {message_id} in channel {channel_to_search.name}")
-                            # Update the database with the correct channel
-                            save_reaction_role(message_id, event_role.id, '✅', target_channel.id, channel_to_search.id)
-                            bot.reaction_roles[message_id]['reaction_message_channel_id'] = channel_to_search.id
-                            logger.info(f"Updated reaction message channel ID to {channel_to_search.id}")
+                            logger.info("Found reaction message %s in channel %s", message_id, channel_to_search.name)
+                            # Remember the correct channel; it is saved to the database below
+                            new_role_data['reaction_message_channel_id'] = channel_to_search.id
+                            bot.msg_channel_cache[message_id] = channel_to_search.id
+                            logger.info("Updated reaction message channel ID to %s", channel_to_search.id)
                             break
                         except discord.NotFound:
-                            logger.debug(f"Message {message_id} not found in {channel_to_search.name}")
+                            logger.debug("Message %s not found in %s", message_id, channel_to_search.name)
+                            bot.msg_channel_miss_cache.add((message_id, channel_to_search.id))
                             continue
                         except discord.Forbidden:
-                            logger.debug(f"No permission to read channel {channel_to_search.name}")
+                            logger.debug("No permission to read channel %s", channel_to_search.name)
                             continue
                         except Exception as e:
-                            logger.debug(f"Error searching {channel_to_search.name}: {str(e)}")
+                            logger.debug("Error searching %s: %s", channel_to_search.name, e)
                             continue
                     
-                    logger.info(f"Searched channels: {', '.join(channels_searched)}")
+                    logger.info("Searched channels: %s", ', '.join(channels_searched))
                 
                 if not reaction_message:
-                    logger.warning(f"Could not find reaction message {message_id}")
+                    logger.warning("Could not find reaction message %s", message_id)
                     # Continue without updating the reaction message
                 elif not reaction_message.embeds:
-                    logger.warning(f"Reaction message {message_id} has no embeds")
+                    logger.warning("Reaction message %s has no embeds", message_id)
                 else:
-                    logger.info(f"Found reaction message with {len(reaction_message.embeds)} embeds")
-                    embed = reaction_message.embeds[0]
-                    new_embed = discord.Embed.from_dict(embed.to_dict())
-                    
-                    # Update description to reflect traditional nature
+                    logger.info("Found reaction message with %s embeds", len(reaction_message.embeds))
+                    # Edit the existing embed in place; it is replaced by the edit below
+                    new_embed = reaction_message.embeds[0]
                     description = new_embed.description or ""
-                    # Remove team-specific language
-                    if "Teams of" in description:
-                        # Remove the team size info
-                        description = re.sub(r'\(Teams of \d+\)', '', description)
-                    if "to join the CTF!" in description:
-                        description = description.replace("to join the CTF!", "if you will play")
-                    new_embed.description = description.strip()
                     
-                    # Update/replace team registration field with traditional role field
-                    updated_field = False
-                    for i, field in enumerate(new_embed.fields):
-                        if field.name == "Team Registration":
+                    # Only rewrite the embed if it still has team-specific content
+                    needs_update = (
+                        "Teams of" in description
+                        or "to join the CTF!" in description
+                        or any("team" in field.name.lower() or "team" in field.value.lower() for field in new_embed.fields)
+                    )
+                    
+                    if not needs_update:
+                        logger.info("Reaction message embed has no team content, leaving it unchanged")
+                    else:
+                        # Update description to reflect traditional nature
+                        # Remove team-specific language
+                        if "Teams of" in description:
+                            # Remove the team size info
+                            description = re.sub(r'\(Teams of \d+\)', '', description)
+                        if "to join the CTF!" in description:
+                            description = description.replace("to join the CTF!", "if you will play")
+                        new_embed.description = description.strip()
+                        
+                        # Update/replace team registration field with traditional role field,
+                        # falling back to the first field that mentions teams
+                        fields = new_embed.fields
+                        exact_idx = fuzzy_idx = None
+                        for i, field in enumerate(fields):
+                            if field.name == "Team Registration":
+                                exact_idx = i
+                                break
+                            if fuzzy_idx is None and ("team" in field.name.lower() or "team" in field.value.lower()):
+                                fuzzy_idx = i
+                        
+                        target_idx = exact_idx if exact_idx is not None else fuzzy_idx
+                        if target_idx is not None:
                             new_embed.set_field_at(
-                                i,
+                                target_idx,
                                 name="Role",
                                 value=f"React with ✅ to get the {event_role.mention} role and access to the CTF channel",
                                 inline=False
                             )
-                            updated_field = True
-                            logger.info("Updated Team Registration field to Role")
-                            break
-                    
-                    if not updated_field:
-                        # Look for any field that mentions teams and update it
-                        for i, field in enumerate(new_embed.fields):
-                            if "team" in field.name.lower() or "team" in field.value.lower():
-                                new_embed.set_field_at(
-                                    i,
-                                    name="Role",
-                                    value=f"React with ✅ to get the {event_role.mention} role and access to the CTF channel",
-                                    inline=False
-                                )
-                                updated_field = True
+                            if exact_idx is not None:
+                                logger.info("Updated Team Registration field to Role")
+                            else:
                                 logger.info("Updated team-related field to Role")
-                                break
-                    
-                    await reaction_message.edit(embed=new_embed)
-                    logger.info("Successfully updated reaction message embed for traditional CTF")
                         
-            except Exception as e:
-                logger.error(f"Error updating reaction message embed: {str(e)}", exc_info=True)
+                        await reaction_message.edit(embed=new_embed)
+                        logger.info("Successfully updated reaction message embed for traditional CTF")
+                        
+            except Exception:
+                logger.exception("Error updating reaction message embed")
+            
+            # Save the reaction role configuration once the reaction message channel is known
+            save_reaction_role(message_id, event_role.id, '✅', target_channel.id, new_role_data['reaction_message_channel_id'])
             
             # Send a summary message to the main channel
             summary_embed = discord.Embed(
@@ -357,22 +400,33 @@ def setup(bot, guild_id, check_permissions):
                 inline=False
             )
             
-            await target_channel.send(embed=summary_embed)
-            
-            # Send success message to command user
-            success_msg = f"✅ **CTF conversion completed!**\n\n"
-            success_msg += f"**CTF:** {team_config['ctf_name']}\n"
-            success_msg += f"**Members affected:** {total_members}\n"
-            success_msg += f"**Teams removed:** {len(teams_deleted)}\n"
-            success_msg += f"**Single role:** {event_role.mention}\n\n"
-            if teams_deleted:
-                success_msg += f"**Teams deleted:** {', '.join(map(str, teams_deleted))}\n"
-            success_msg += f"**CTF is now traditional** - everyone uses one role and one channel!"
+            if target_channel.id == interaction.channel_id:
+                # The followup already lands in the CTF channel, and the summary
+                # covers everything the success message would say
+                await interaction.followup.send(embed=summary_embed)
+            else:
+                # Send success message to command user
+                parts = [
+                    "✅ **CTF conversion completed!**",
+                    "",
+                    f"**CTF:** {team_config['ctf_name']}",
+                    f"**Members affected:** {total_members}",
+                    f"**Teams removed:** {len(teams_deleted)}",
+                    f"**Single role:** {event_role.mention}",
+                    ""
+                ]
+                if teams_deleted:
+                    parts.append(f"**Teams deleted:** {', '.join(map(str, teams_deleted))}")
+                parts.append("**CTF is now traditional** - everyone uses one role and one channel!")
+                success_msg = "\n".join(parts)
+                
+                await asyncio.gather(
+                    target_channel.send(embed=summary_embed),
+                    interaction.followup.send(success_msg)
+                )
             
-            await interaction.followup.send(success_msg)
-            logger.info(f"Successfully converted CTF {team_config['ctf_name']} to traditional format by {interaction.user.name}#{interaction.user.discriminator}")
+            logger.info("Successfully converted CTF %s to traditional format by %s#%s", team_config['ctf_name'], interaction.user.name, interaction.user.discriminator)
             
         except Exception as e:
-            error_traceback = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
-            logger.error(f"Error in converttosingle command:\n{error_traceback}")
+            logger.exception("Error in converttosingle command")
             await interaction.followup.send(f"Error converting CTF to single format: {str(e)}", ephemeral=True)
\ No newline at end of file
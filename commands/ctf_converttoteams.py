@@ -4,9 +4,10 @@ import logging
 import traceback
 import re
 import math
+import asyncio
 from typing import Optional
-from db import (save_reaction_role, get_team_info, save_team_info, get_team_members, 
-                add_team_member, remove_team_member, remove_empty_team, get_ctf_by_channel,
+from db import (save_reaction_role, get_team_info, save_team_conversion, get_team_members, 
+                add_team_members_bulk, remove_team_member, remove_empty_team, get_ctf_by_channel,
                 get_reaction_message_channel)
 
 # Function to get a logger
@@ -127,8 +128,9 @@ def setup(bot, guild_id, check_permissions):
                 await interaction.followup.send("Could not find the existing CTF role! The role may have been deleted.", ephemeral=True)
                 return
             
-            # Get all members with the existing role
-            members_with_role = [member for member in interaction.guild.members if existing_role in member.roles]
+            # Get all members with the existing role, ordered by ID so team
+            # assignment doesn't depend on the member cache's order
+            members_with_role = sorted(existing_role.members, key=lambda m: m.id)
             logger.info(f"Found {len(members_with_role)} members with role {existing_role.name}")
             
             if len(members_with_role) == 0:
@@ -160,40 +162,33 @@ def setup(bot, guild_id, check_permissions):
             # Create teams and assign members
             team_assignments = []
             created_teams = []
-            
-            for team_num in range(1, num_teams + 1):
-                start_idx = (team_num - 1) * team_size
-                end_idx = min(start_idx + team_size, len(members_with_role))
-                team_members = members_with_role[start_idx:end_idx]
-                
-                logger.info(f"Creating team {team_num} with {len(team_members)} members")
-                
-                # Add members to database
-                for member in team_members:
-                    add_team_member(message_id, team_num, member.id)
-                
-                # Create team role
-                team_role_name = f"{ctf_name.lower()}-team-{team_num}"
-                team_role = await guild.create_role(
-                    name=team_role_name,
-                    reason=f"Created for CTF team {team_num} during conversion"
+            failed_teams = []
+            member_rows = []
+            
+            # Team channel overwrites shared by every team; only the team role differs
+            base_overwrites = {
+                guild.default_role: discord.PermissionOverwrite(
+                    read_messages=False
+                ),
+                guild.me: discord.PermissionOverwrite(
+                    view_channel=True,
+                    read_messages=True,
+                    send_messages=True,
+                    create_public_threads=True,
+                    send_messages_in_threads=True,
+                    embed_links=True,
+                    attach_files=True,
+                    add_reactions=True,
+                    manage_messages=True
                 )
-                
-                # Create team channel
-                team_channel_name = f"{ctf_name.lower().replace(' ', '-')}-team-{team_num}"
-                team_channel_name = re.sub(r'[^a-zA-Z0-9_-]', '', team_channel_name)
-                
-                overwrites = {
-                    guild.default_role: discord.PermissionOverwrite(
-                        read_messages=False
-                    ),
-                    team_role: discord.PermissionOverwrite(
-                        read_messages=True,
-                        send_messages=True,
-                        create_public_threads=True,
-                        send_messages_in_threads=True
-                    ),
-                    guild.me: discord.PermissionOverwrite(
+            }
+            
+            # Add texit bot permissions if enabled
+            if team_config.get('add_texit_bot', True):
+                texit_bot_id = 510789298321096704
+                texit_bot_member = guild.get_member(texit_bot_id)
+                if texit_bot_member:
+                    base_overwrites[texit_bot_member] = discord.PermissionOverwrite(
                         view_channel=True,
                         read_messages=True,
                         send_messages=True,
@@ -204,41 +199,23 @@ def setup(bot, guild_id, check_permissions):
                         add_reactions=True,
                         manage_messages=True
                     )
-                }
-                
-                # Add texit bot permissions if enabled
-                if team_config.get('add_texit_bot', True):
-                    texit_bot_id = 510789298321096704
-                    texit_bot_member = guild.get_member(texit_bot_id)
-                    if texit_bot_member:
-                        overwrites[texit_bot_member] = discord.PermissionOverwrite(
-                            view_channel=True,
-                            read_messages=True,
-                            send_messages=True,
-                            create_public_threads=True,
-                            send_messages_in_threads=True,
-                            embed_links=True,
-                            attach_files=True,
-                            add_reactions=True,
-                            manage_messages=True
-                        )
-                
-                team_channel = await guild.create_text_channel(
-                    name=team_channel_name,
-                    category=category,
-                    overwrites=overwrites
+            
+            async def populate_team(team_num, team_members, team_role, team_channel):
+                """Give a team's members their role and welcome them in the team channel"""
+                # Assign team role to members but keep the existing event role; add_roles
+                # only adds the one role, so concurrent role changes aren't overwritten
+                edit_results = await asyncio.gather(
+                    *(member.add_roles(team_role, reason=f"CTF team {team_num} conversion")
+                      for member in team_members),
+                    return_exceptions=True
                 )
-                
-                # Assign team role to members but keep the existing event role
                 member_mentions = []
-                for member in team_members:
-                    try:
-                        # Add new team role (keep existing event role)
-                        await member.add_roles(team_role)
+                for member, result in zip(team_members, edit_results):
+                    if isinstance(result, BaseException):
+                        logger.error(f"Error converting user {member.id}: {str(result)}")
+                    else:
                         member_mentions.append(member.mention)
                         logger.debug(f"Converted user {member.id} to team {team_num} (kept event role)")
-                    except Exception as e:
-                        logger.error(f"Error converting user {member.id}: {str(e)}")
                 
                 # Send welcome message to team channel
                 team_embed = discord.Embed(
@@ -254,9 +231,79 @@ def setup(bot, guild_id, check_permissions):
                 )
                 
                 await team_channel.send(embed=team_embed)
+            
+            # Create the team roles and channels one team at a time, so they are
+            # ordered by team number
+            built_teams = []
+            for team_num in range(1, num_teams + 1):
+                team_members = members_with_role[(team_num - 1) * team_size:team_num * team_size]
+                logger.info(f"Creating team {team_num} with {len(team_members)} members")
+                
+                # Create team role
+                team_role_name = f"{ctf_name.lower()}-team-{team_num}"
+                try:
+                    team_role = await guild.create_role(
+                        name=team_role_name,
+                        reason=f"Created for CTF team {team_num} during conversion"
+                    )
+                except Exception as e:
+                    logger.error(f"Error creating role for team {team_num}: {str(e)}")
+                    failed_teams.append(team_num)
+                    continue
+                
+                # Create team channel
+                team_channel_name = f"{ctf_name.lower().replace(' ', '-')}-team-{team_num}"
+                team_channel_name = re.sub(r'[^a-zA-Z0-9_-]', '', team_channel_name)
                 
+                overwrites = {
+                    **base_overwrites,
+                    team_role: discord.PermissionOverwrite(
+                        read_messages=True,
+                        send_messages=True,
+                        create_public_threads=True,
+                        send_messages_in_threads=True
+                    )
+                }
+                
+                team_channel = None
+                try:
+                    team_channel = await guild.create_text_channel(
+                        name=team_channel_name,
+                        category=category,
+                        overwrites=overwrites
+                    )
+                except Exception as e:
+                    logger.error(f"Error creating channel for team {team_num}: {str(e)}")
+                
+                if team_channel is None:
+                    # Roll back the role so no half-made team is left behind
+                    try:
+                        await team_role.delete(reason="Team channel could not be created during conversion")
+                    except Exception as e:
+                        logger.error(f"Error removing role for team {team_num}: {str(e)}")
+                    failed_teams.append(team_num)
+                    continue
+                
+                built_teams.append((team_num, team_members, team_role, team_channel))
+            
+            # Assign members and send the welcome messages for all teams concurrently
+            results = await asyncio.gather(
+                *(populate_team(*team) for team in built_teams),
+                return_exceptions=True
+            )
+            for (team_num, team_members, _, _), result in zip(built_teams, results):
+                if isinstance(result, BaseException):
+                    logger.error(f"Error setting up team {team_num}: {str(result)}")
+                    failed_teams.append(team_num)
+                    continue
+                # Only fully created teams are recorded
+                member_rows.extend((team_num, member.id) for member in team_members)
                 team_assignments.append(f"Team {team_num}: {len(team_members)} members")
                 created_teams.append(team_num)
+            failed_teams.sort()
+            
+            # Add all members to the database in one transaction
+            add_team_members_bulk(message_id, member_rows)
             
             # Update the main channel permissions (event role can access, but only bot can post)
             try:
@@ -287,9 +334,8 @@ def setup(bot, guild_id, check_permissions):
             except Exception as e:
                 logger.error(f"Error updating main channel permissions: {str(e)}")
             
-            # Update the reaction role configuration in database and memory
-            save_reaction_role(message_id, existing_role.id, '✅', target_channel.id, role_data.get('reaction_message_channel_id'))
-            save_team_info(message_id, team_config)
+            # Update the reaction role and team configuration in database and memory
+            save_team_conversion(message_id, existing_role.id, target_channel.id, role_data.get('reaction_message_channel_id'), team_config)
             
             bot.reaction_roles[message_id] = {
                 'role_id': existing_role.id,  # Keep the event role
@@ -306,8 +352,8 @@ def setup(bot, guild_id, check_permissions):
             
             # Update the reaction message embed to reflect team-based nature
             try:
-                # Get the reaction message channel ID from database
-                reaction_message_channel_id = get_reaction_message_channel(message_id)
+                # Get the reaction message channel ID from memory, then the database
+                reaction_message_channel_id = bot.msg_channel_cache.get(message_id) or get_reaction_message_channel(message_id)
                 reaction_message = None
                 
                 if reaction_message_channel_id:
@@ -332,7 +378,13 @@ def setup(bot, guild_id, check_permissions):
                     # Fall back to searching all category channels if no stored channel
                     channels_searched = []
                     
-                    for channel_to_search in target_channel.category.text_channels:
+                    # The reaction message is normally in the CTF channel itself, so
+                    # try that first, and skip channels already known not to hold it
+                    category_channels = target_channel.category.text_channels
+                    search_order = [target_channel, *(c for c in category_channels if c.id != target_channel.id)]
+                    for channel_to_search in search_order:
+                        if (message_id, channel_to_search.id) in bot.msg_channel_miss_cache:
+                            continue
                         channels_searched.append(channel_to_search.name)
                         try:
                             reaction_message = await channel_to_search.fetch_message(message_id)
@@ -340,10 +392,12 @@ def setup(bot, guild_id, check_permissions):
                             # Update the database with the correct channel
                             save_reaction_role(message_id, existing_role.id, '✅', target_channel.id, channel_to_search.id)
                             bot.reaction_roles[message_id]['reaction_message_channel_id'] = channel_to_search.id
+                            bot.msg_channel_cache[message_id] = channel_to_search.id
                             logger.info(f"Updated reaction message channel ID to {channel_to_search.id}")
                             break
                         except discord.NotFound:
                             logger.debug(f"Message {message_id} not found in {channel_to_search.name}")
+                            bot.msg_channel_miss_cache.add((message_id, channel_to_search.id))
                             continue
                         except discord.Forbidden:
                             logger.debug(f"No permission to read channel {channel_to_search.name}")
@@ -442,6 +496,8 @@ def setup(bot, guild_id, check_permissions):
             success_msg += f"**Teams created:** {len(created_teams)}\n"
             success_msg += f"**Team size:** {team_size}\n\n"
             success_msg += f"**Teams created:** {', '.join(map(str, created_teams))}\n"
+            if failed_teams:
+                success_msg += f"**Teams that could not be created:** {', '.join(map(str, failed_teams))}\n"
             success_msg += f"**Event role (main channel access):** {existing_role.name}"
             
             await interaction.followup.send(success_msg)
@@ -4,7 +4,7 @@ import logging
 from datetime import datetime
 import re
 from util import fetch_ics, parse_ics, fetch_event_image
-from db import save_reaction_role, get_team_info, save_team_info, get_team_members, add_team_member, remove_team_member, remove_empty_team, get_available_team_slot
+from db import save_reaction_role, save_welcome_message, get_team_info, save_team_info, get_team_members, add_team_member, remove_team_member, remove_empty_team, get_available_team_slot
 
 # Function to get a logger
 def get_logger():
@@ -324,7 +324,19 @@ def setup(bot, guild_id, check_permissions):
             if event_info['url'] and event_info['url'] != "N/A":
                 channel_embed.add_field(name="CTF URL", value=event_info['url'], inline=False)
             
-            await ctf_channel.send(embed=channel_embed)
+            welcome_message = await ctf_channel.send(embed=channel_embed)
+            
+            # Remember the welcome embed so later commands can fetch it directly
+            try:
+                save_welcome_message(ctf_channel.id, welcome_message.id)
+            except Exception as e:
+                logger.warning(f"Could not save welcome message for channel {ctf_channel.name}: {str(e)}")
+            
+            # Pin the welcome embed so it can be found without scanning history
+            try:
+                await welcome_message.pin(reason="CTF welcome message")
+            except Exception as e:
+                logger.warning(f"Could not pin welcome message in channel {ctf_channel.name}: {str(e)}")
 
             # Save reaction role with team info and IMPORTANT: store reaction message channel ID
             if enable_team_limits:
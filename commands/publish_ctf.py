@@ -110,6 +110,8 @@ def setup(bot, guild_id, check_permissions):
 
             for message_id in to_remove:
                 bot.reaction_roles.pop(message_id, None)
+            for channel_id in [cid for cid, mid in bot.ctf_cache.items() if mid in to_remove]:
+                del bot.ctf_cache[channel_id]
 
             await interaction.followup.send(
                 f"CTF published!\n"
@@ -38,6 +38,11 @@ def setup_database():
                   joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                   UNIQUE(message_id, user_id))''')
     
+    # Create welcome_messages table for locating each CTF channel's welcome embed
+    c.execute('''CREATE TABLE IF NOT EXISTS welcome_messages
+                 (channel_id INTEGER PRIMARY KEY,
+                  message_id INTEGER)''')
+    
     conn.commit()
     conn.close()
 
@@ -127,6 +132,41 @@ def get_reaction_message_channel(message_id):
     finally:
         conn.close()
 
+def save_welcome_message(channel_id, message_id):
+    """Remember which message holds the welcome embed for a CTF channel"""
+    conn = sqlite3.connect('ctf_bot.db')
+    c = conn.cursor()
+    
+    try:
+        c.execute('''INSERT OR REPLACE INTO welcome_messages (channel_id, message_id) 
+                     VALUES (?, ?)''',
+                  (channel_id, message_id))
+        conn.commit()
+        logger = logging.getLogger('discord_bot')
+        logger.info(f"Saved welcome message {message_id} for channel {channel_id}")
+    except Exception as e:
+        logger = logging.getLogger('discord_bot')
+        logger.error(f"Error saving welcome message for channel {channel_id}: {str(e)}")
+        raise
+    finally:
+        conn.close()
+
+def get_welcome_message(channel_id):
+    """Get the welcome embed message ID for a CTF channel"""
+    conn = sqlite3.connect('ctf_bot.db')
+    c = conn.cursor()
+    
+    try:
+        c.execute('SELECT message_id FROM welcome_messages WHERE channel_id = ?', (channel_id,))
+        row = c.fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        logger = logging.getLogger('discord_bot')
+        logger.error(f"Error getting welcome message for channel {channel_id}: {str(e)}")
+        raise
+    finally:
+        conn.close()
+
 def load_reaction_roles():
     conn = sqlite3.connect('ctf_bot.db')
     c = conn.cursor()
@@ -214,6 +254,33 @@ def save_team_info(message_id, team_config):
     finally:
         conn.close()
 
+def save_team_conversion(message_id, role_id, channel_id, reaction_message_channel_id, team_config):
+    """Save a CTF's reaction role and team configuration in one transaction"""
+    conn = sqlite3.connect('ctf_bot.db')
+    c = conn.cursor()
+    
+    try:
+        c.execute('''INSERT OR REPLACE INTO reaction_roles 
+                     (message_id, role_id, emoji, channel_id, reaction_message_channel_id) 
+                     VALUES (?, ?, ?, ?, ?)''',
+                  (message_id, role_id, '✅', channel_id, reaction_message_channel_id))
+        c.execute('''INSERT OR REPLACE INTO team_configs 
+                     (message_id, ctf_name, team_size, category_id, guild_id, add_texit_bot) 
+                     VALUES (?, ?, ?, ?, ?, ?)''',
+                  (message_id, team_config['ctf_name'], team_config['team_size'],
+                   team_config['category_id'], team_config['guild_id'],
+                   team_config.get('add_texit_bot', False)))
+        conn.commit()
+        logger = logging.getLogger('discord_bot')
+        logger.info(f"Saved team conversion for message {message_id}: {team_config['ctf_name']}")
+    except Exception as e:
+        conn.rollback()
+        logger = logging.getLogger('discord_bot')
+        logger.error(f"Error saving team conversion for message {message_id}: {str(e)}")
+        raise
+    finally:
+        conn.close()
+
 def get_team_info(message_id):
     """Get team configuration for a CTF message"""
     conn = sqlite3.connect('ctf_bot.db')
@@ -270,6 +337,27 @@ def add_team_member(message_id, team_number, user_id):
     finally:
         conn.close()
 
+def add_team_members_bulk(message_id, rows):
+    """Add many users to teams at once, rows being (team_number, user_id) pairs"""
+    conn = sqlite3.connect('ctf_bot.db')
+    c = conn.cursor()
+    
+    try:
+        # Users already in a team for this CTF are skipped, as with add_team_member
+        c.executemany('''INSERT OR IGNORE INTO team_members (message_id, team_number, user_id) 
+                         VALUES (?, ?, ?)''',
+                      [(message_id, team_number, user_id) for team_number, user_id in rows])
+        conn.commit()
+        logger = logging.getLogger('discord_bot')
+        logger.info(f"Added {c.rowcount} users to teams for message {message_id}")
+    except Exception as e:
+        conn.rollback()
+        logger = logging.getLogger('discord_bot')
+        logger.error(f"Error adding users to teams for message {message_id}: {str(e)}")
+        raise
+    finally:
+        conn.close()
+
 def remove_team_member(message_id, user_id):
     """Remove a user from their team"""
     conn = sqlite3.connect('ctf_bot.db')
@@ -336,6 +424,23 @@ def remove_empty_team(message_id, team_number):
     finally:
         conn.close()
 
+def delete_team_records(message_id):
+    """Remove a CTF's team config and all of its team members in one transaction"""
+    conn = sqlite3.connect('ctf_bot.db')
+    c = conn.cursor()
+    
+    try:
+        c.execute('DELETE FROM team_configs WHERE message_id = ?', (message_id,))
+        c.execute('DELETE FROM team_members WHERE message_id = ?', (message_id,))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger = logging.getLogger('discord_bot')
+        logger.error(f"Error removing team records for message {message_id}: {str(e)}")
+        raise
+    finally:
+        conn.close()
+
 def get_available_team_slot(message_id, team_size):
     """Find the lowest numbered team with available slots, or return next team number"""
     conn = sqlite3.connect('ctf_bot.db')
@@ -405,6 +405,41 @@ async def handle_team_reaction_remove(reaction, user):
         logger.error(f"Error handling team reaction removal for user {user.id}: {str(e)}", exc_info=True)
 
 # EVENTS
+@bot.event
+async def setup_hook():
+    # Runs once before connecting, so reconnects don't re-register commands
+    try:
+        # Setup database and load reaction roles
+        setup_database()
+        bot.reaction_roles = load_reaction_roles()
+        
+        # Channel holding each known reaction message, and the
+        # (message_id, channel_id) pairs already found not to hold it
+        bot.msg_channel_cache = {
+            message_id: role_info['reaction_message_channel_id']
+            for message_id, role_info in bot.reaction_roles.items()
+            if role_info.get('reaction_message_channel_id')
+        }
+        bot.msg_channel_miss_cache = set()
+        
+        # CTF reaction message for each CTF channel, {channel_id: message_id};
+        # the first stored CTF wins, as with get_ctf_by_channel
+        bot.ctf_cache = {}
+        for message_id, role_info in bot.reaction_roles.items():
+            if role_info.get('channel_id'):
+                bot.ctf_cache.setdefault(role_info['channel_id'], message_id)
+        
+        # Setup commands
+        setup_commands(bot, GUILD_ID, check_permissions)
+        
+        # Sync commands with Discord
+        await bot.tree.sync(guild=discord.Object(id=GUILD_ID))
+        
+    except Exception as e:
+        error_traceback = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
+        logger.error(f"Error in setup_hook:\n{error_traceback}")
+        raise
+
 @bot.event
 async def on_raw_reaction_add(payload):
     try:
@@ -487,16 +522,6 @@ async def on_raw_reaction_remove(payload):
 @bot.event
 async def on_ready():
     try:
-        # Setup database and load reaction roles
-        setup_database()
-        bot.reaction_roles = load_reaction_roles()
-        
-        # Setup commands
-        setup_commands(bot, GUILD_ID, check_permissions)
-        
-        # Sync commands with Discord
-        await bot.tree.sync(guild=discord.Object(id=GUILD_ID))
-        
         logger.info(f'Bot logged in as {bot.user}')
         logger.info(f'Loaded {len(bot.reaction_roles)} reaction roles from database')
         
@@ -72,6 +72,11 @@ def format_time_difference(start_timestamp, end_timestamp):
         
     return " ".join(parts) if parts else "0m"
 
+def is_ctf_category(name):
+    # Category names start with a year and end in " CTFs", e.g. "2025 CTFs"
+    # or "2025 Winter CTFs"
+    return len(name) >= 9 and name.endswith(" CTFs") and name[:4].isdigit()
+
 async def fetch_ics(url):
     clean_url = url.split('?')[0].rstrip('/')
     event_id = clean_url.split('/')[-1]